@@ -1,11 +1,20 @@
 #Question 3
 
-import heapq
+from array import array
 import networkx as nx
 import numpy as np
-import random
 import matplotlib.pyplot as plt
 from collections import Counter
+from scipy import stats
+
+from Arrivals import ArrivalProcess
+from Demand import ODSampler
+from Distribution import Distribution, RandomStreams
+from EventSet import HeapEventSet
+from IncidentRates import load_rate_table
+from Incidents import IncidentIndex
+from Network import CompiledNetwork, IncidentRouter
+from TimeSeries import ActiveCountSeries
 
 
 GML_FILE = r"C:\Users\maart\Downloads\networkAssignment.gml"
@@ -13,6 +22,9 @@ CAR_SPEED = 100.0
 TRUCK_SPEED = 80.0
 CAR_FRACTION = 0.9
 SIMULATION_DURATION_MIN = 24 * 60
+# Rerouting: a blocked arc counts as this many km longer, the distance a car
+# covers in the mean incident delay of 10 min
+REROUTE_PENALTY_KM = 10.0 / 60 * CAR_SPEED
 
 HOURLY_RATES = [
     314.2, 162.4, 138.6, 148.8, 273.2, 1118.8, 2773.8, 4036.2,
@@ -20,151 +32,267 @@ HOURLY_RATES = [
     4945.4, 4525.8, 2847.8, 1828.0, 1378.4, 1271.2, 1171.2, 767.6
 ]
 
-hourly_incident_rates = incident_rate_per_hour.sort_values(by='Hour')['incident_rate'].tolist()
-def incident_duration_sampler():
-    return np.random.gamma(shape=1.19, scale=6.09)
-
-event_counter = 0
-FES = []
-vehicle_id_counter = 0
-vehicle_stats = []
-delayed_vehicle_count = [0] * SIMULATION_DURATION_MIN
-active_incidents = set()
-active_incident_count = [0] * 1440
-ab_car_stats = []  # For Q3.5
+SMOOTH_ARRIVALS = False  # True: piecewise-linear rate profile (see ArrivalProcess.hourly)
+ARRIVAL_PROCESS = ArrivalProcess.hourly(HOURLY_RATES, SMOOTH_ARRIVALS)
+
+# Hourly incident rates estimated from the RWS data; build the table with
+# "python IncidentRates.py incident_rates.json <RWS csv files>" (or Question 1);
+# it is built locally and not part of the repository
+INCIDENT_RATE_FILE = "incident_rates.json"
+# Best-fit incident duration distribution (minutes), written by Question 1
+# with DistributionFitting.save_best
+INCIDENT_DURATION_FILE = "incident_duration.json"
+
+# Event type codes; the event payload is a plain int:
+# arrival -> origin * n_nodes + destination, enter_edge -> vehicle id,
+# incident start/end -> arc id (the edge in its GML direction, see
+# CompiledNetwork.arc; an incident blocks one direction of the road)
+VEHICLE_ARRIVAL, ENTER_EDGE, INCIDENT_START, INCIDENT_END = range(4)
+
 CITY_A_NAME = "Knooppunt Terbregseplein"
 CITY_B_NAME = "Knooppunt Leenderheide"
-CITY_A_ID = None
-CITY_B_ID = None
 
 class Vehicle:
+    __slots__ = ('id', 'origin', 'destination', 'is_car', 'edges', 'current_index', 'node',
+                 'start_time', 'total_time', 'delay_time', 'incidents', 'is_AB_car')
+
     def __init__(self, id, origin, destination, is_car, start_time):
         self.id = id
         self.origin = origin
         self.destination = destination
         self.is_car = is_car
-        self.path = []
+        self.edges = []  # edge ids of the route
         self.current_index = 0
+        self.node = origin  # current junction
         self.start_time = start_time
         self.total_time = 0.0
         self.delay_time = 0.0
         self.incidents = 0
         self.is_AB_car = False
 
-vehicles = {}
-
-def schedule_event(time, event_type, data):
-    global event_counter
-    heapq.heappush(FES, (time, event_counter, event_type, data))
-    event_counter += 1
 
-
-def generate_daily_incidents(graph):
-    incidents = []
-    edges = list(graph.edges())
-    for hour in range(24):
-        lam = hourly_incident_rates[hour]
-        num_incidents = np.random.poisson(lam)
-        for _ in range(num_incidents):
-            start_min = hour * 60 + np.random.uniform(0, 60)
-            duration = incident_duration_sampler()
-            end_min = start_min + duration
-            edge = random.choice(edges)
-            incidents.append((start_min, "incident_start", edge))
-            incidents.append((end_min, "incident_end", edge))
-            for minute in range(int(start_min), int(end_min)):
-                if 0 <= minute < 1440:
-                    active_incident_count[minute] += 1
-    return incidents
-
-
-def process_event(time, event_type, data, graph):
-    global vehicle_id_counter
-
-    if event_type == "vehicle_arrival":
-        origin, destination = data
-        is_car = random.random() < CAR_FRACTION
-        v = Vehicle(vehicle_id_counter, origin, destination, is_car, time)
-        if origin == CITY_A_ID and destination == CITY_B_ID and is_car:
+class TripRecords:
+    """
+    Travel time, delay time and number of incidents of every finished trip,
+    stored in typed arrays (a few bytes per trip instead of a dict per trip).
+    """
+    __slots__ = ('travel_time', 'delay_time', 'incidents')
+
+    def __init__(self):
+        self.travel_time = array('d')
+        self.delay_time = array('d')
+        self.incidents = array('l')
+
+    def append(self, travel_time, delay_time, incidents):
+        self.travel_time.append(travel_time)
+        self.delay_time.append(delay_time)
+        self.incidents.append(incidents)
+
+    def __len__(self):
+        return len(self.travel_time)
+
+
+class Simulation:
+    """
+    One replication of the incident model (24 h).
+
+    All state (FES, vehicles, incidents, outputs) belongs to the instance, so
+    replications can run back-to-back or in parallel workers without
+    re-importing this module.  Every stochastic component draws from its own
+    stream of `RandomStreams(seed)`; the same seed with and without incidents
+    gives common random numbers.  `event_set` is the future event set class
+    (see EventSet.py).  Arrivals come from a lazy stream (see Arrivals.py):
+    only the next arrival is in the FES, and each arrival schedules the one
+    after it.  The OD pairs of an hour are drawn in one batch; `od_weights`
+    (node weights or an OD matrix, see Demand.py) makes them non-uniform.
+    `arrival_process` (default ARRIVAL_PROCESS) gives the arrival rate profile.
+    With `reroute` a vehicle re-plans its route at every junction, avoiding
+    arcs with active incidents (see IncidentRouter); otherwise it follows
+    the shortest route chosen at arrival.
+    """
+
+    def __init__(self, graph, seed=None, incidents=True, incident_rates=None,
+                 event_set=HeapEventSet, od_weights=None, reroute=False,
+                 arrival_process=None):
+        self.network = graph if isinstance(graph, CompiledNetwork) else CompiledNetwork(graph)
+        self.incidents_enabled = incidents
+        if incident_rates is None and incidents:
+            incident_rates = load_rate_table(INCIDENT_RATE_FILE)
+        self.incident_rates = incident_rates
+
+        self.streams = RandomStreams(seed)
+        self.arrival_rng = self.streams.generator('arrivals')
+        self.routing_rng = self.streams.generator('routing')
+        self.incident_rng = self.streams.generator('incidents')
+        self.router = IncidentRouter(self.network, REROUTE_PENALTY_KM) if reroute else None
+        self._edge_u = self.network.edge_u.tolist()
+        self._edge_v = self.network.edge_v.tolist()
+        self.arrival_process = ARRIVAL_PROCESS if arrival_process is None else arrival_process
+        self.od_sampler = ODSampler(self.network.n_nodes, od_weights)
+        self.arrivals = self.arrival_stream()
+        self.vehicle_class_dist = self.streams.distribution('vehicle_class', stats.uniform())
+        self.link_time_dist = self.streams.distribution('link_time', stats.norm())
+        self.incident_duration_dist = Distribution.load(INCIDENT_DURATION_FILE,
+                                                        rng=self.streams.generator('incident_duration'))
+        self.incident_delay_dist = self.streams.distribution('incident_delay', stats.uniform(5, 10))
+
+        self.FES = event_set()
+        self.event_counter = 0
+        self.vehicle_id_counter = 0
+        self.vehicles = {}  # vehicles on the road; finished ones are removed
+        self.active_incidents = IncidentIndex(self.network.n_arcs)
+        # per minute, minute m counting the intervals with int(start) <= m < int(end)
+        self.delayed_vehicle_series = ActiveCountSeries(SIMULATION_DURATION_MIN, overlap=False)
+        self.active_incident_series = ActiveCountSeries(1440, overlap=False)
+
+        names = self.network.names
+        self.city_a_id = names.index(CITY_A_NAME) if CITY_A_NAME in names else None
+        self.city_b_id = names.index(CITY_B_NAME) if CITY_B_NAME in names else None
+
+        # dispatch table, indexed by event code
+        self.handlers = [self.on_vehicle_arrival, self.on_enter_edge,
+                         self.on_incident_start, self.on_incident_end]
+
+        # outputs
+        self.vehicle_stats = TripRecords()
+        self.ab_car_stats = TripRecords()  # For Q3.5
+        self.delayed_vehicle_count = None
+        self.active_incident_count = None
+
+    def incident_duration_sampler(self):
+        return self.incident_duration_dist.rvs()
+
+    def schedule_event(self, time, event_type, data):
+        """`event_type` is one of the event codes, `data` a plain int payload."""
+        self.FES.push((time, self.event_counter, event_type, data))
+        self.event_counter += 1
+
+    def generate_daily_incidents(self):
+        incidents = []
+        for hour in range(24):
+            lam = self.incident_rates[hour]
+            num_incidents = self.incident_rng.poisson(lam)
+            for _ in range(num_incidents):
+                start_min = hour * 60 + self.incident_rng.uniform(0, 60)
+                duration = self.incident_duration_sampler()
+                end_min = start_min + duration
+                arc = 2 * int(self.incident_rng.integers(self.network.n_edges))
+                self.active_incidents.add_window(arc, start_min, end_min)
+                incidents.append((start_min, INCIDENT_START, arc))
+                incidents.append((end_min, INCIDENT_END, arc))
+                self.active_incident_series.add(start_min, end_min)
+        return incidents
+
+    def arrival_stream(self):
+        """Yields (time, origin * n_nodes + destination) for every arrival."""
+        n_nodes = self.network.n_nodes
+        for times in self.arrival_process.batches(self.arrival_rng):
+            origins, destinations = self.od_sampler.sample(len(times), self.routing_rng)
+            yield from zip(times.tolist(), (origins * n_nodes + destinations).tolist())
+
+    def schedule_next_arrival(self):
+        arrival = next(self.arrivals, None)
+        if arrival is not None:
+            self.schedule_event(arrival[0], VEHICLE_ARRIVAL, arrival[1])
+
+    def on_vehicle_arrival(self, time, od):
+        self.schedule_next_arrival()
+        origin, destination = divmod(od, self.network.n_nodes)
+        is_car = self.vehicle_class_dist.rvs() < CAR_FRACTION
+        v = Vehicle(self.vehicle_id_counter, origin, destination, is_car, time)
+        if origin == self.city_a_id and destination == self.city_b_id and is_car:
             v.is_AB_car = True
-        vehicle_id_counter += 1
+        self.vehicle_id_counter += 1
 
         try:
-            path = nx.shortest_path(graph, origin, destination, weight='length')
-            v.path = path
-            vehicles[v.id] = v
-            schedule_event(time, "enter_edge", {'vehicle_id': v.id})
-        except:
+            v.edges = self.network.route(origin, destination)
+            self.vehicles[v.id] = v
+            self.schedule_event(time, ENTER_EDGE, v.id)
+        except KeyError:
             return
 
-    elif event_type == "enter_edge":
-        v = vehicles[data['vehicle_id']]
-        if v.current_index >= len(v.path) - 1:
-            v.total_time = time - v.start_time
-            stat = {
-                'travel_time': v.total_time,
-                'delay_time': v.delay_time,
-                'incidents': v.incidents
-            }
-            vehicle_stats.append(stat)
-            if v.is_AB_car:
-                ab_car_stats.append(stat)
-            return
-
-        u, v_next = v.path[v.current_index], v.path[v.current_index + 1]
-        edge = (u, v_next)
-        edge_length = graph[u][v_next]['length'] / 1000.0
+    def finish_trip(self, time, v):
+        v.total_time = time - v.start_time
+        self.vehicle_stats.append(v.total_time, v.delay_time, v.incidents)
+        if v.is_AB_car:
+            self.ab_car_stats.append(v.total_time, v.delay_time, v.incidents)
+        del self.vehicles[v.id]
+
+    def on_enter_edge(self, time, vehicle_id):
+        v = self.vehicles[vehicle_id]
+        if self.router is None:
+            if v.current_index >= len(v.edges):
+                self.finish_trip(time, v)
+                return
+            edge = v.edges[v.current_index]
+        else:
+            if v.node == v.destination:
+                self.finish_trip(time, v)
+                return
+            edge = self.router.next_edge(v.node, v.destination, self.active_incidents.blocked_key)
+        if self._edge_u[edge] == v.node:
+            arc = 2 * edge
+            v.node = self._edge_v[edge]
+        else:
+            arc = 2 * edge + 1
+            v.node = self._edge_u[edge]
+        edge_length = self.network.length_km[edge]
         speed = CAR_SPEED if v.is_car else TRUCK_SPEED
-        travel_time = max(np.random.normal((edge_length / speed) * 60, (edge_length / speed) * 3), 0.1)
+        travel_time = max((edge_length / speed) * 60 + (edge_length / speed) * 3 * self.link_time_dist.rvs(), 0.1)
 
-        if edge in active_incidents:
-            delay = np.random.uniform(5, 15)
+        if self.active_incidents.is_blocked(arc):
+            delay = self.incident_delay_dist.rvs()
             v.delay_time += delay
             v.incidents += 1
-            for m in range(int(time), int(time + delay)):
-                if 0 <= m < len(delayed_vehicle_count):
-                    delayed_vehicle_count[m] += 1
+            self.delayed_vehicle_series.add(time, time + delay)
             travel_time += delay
 
         v.current_index += 1
-        schedule_event(time + travel_time, "enter_edge", {'vehicle_id': v.id})
+        self.schedule_event(time + travel_time, ENTER_EDGE, v.id)
 
-    elif event_type == "incident_start":
-        active_incidents.add(data)
+    def on_incident_start(self, time, arc):
+        self.active_incidents.start(arc)
 
-    elif event_type == "incident_end":
-        active_incidents.discard(data)
+    def on_incident_end(self, time, arc):
+        self.active_incidents.end(arc)
 
+    def process_event(self, time, event_type, data):
+        self.handlers[event_type](time, data)
 
-def run_discrete_event_sim(graph):
-    global CITY_A_ID, CITY_B_ID
-    CITY_A_ID = next((n for n, d in graph.nodes(data=True) if d.get('name') == CITY_A_NAME), None)
-    CITY_B_ID = next((n for n, d in graph.nodes(data=True) if d.get('name') == CITY_B_NAME), None)
+    def run(self):
+        """Simulate the day; returns (vehicle_stats, delayed_vehicle_count)."""
+        self.schedule_next_arrival()
 
-    all_nodes = list(graph.nodes())
-    for hour in range(24):
-        lam = HOURLY_RATES[hour]
-        num_arrivals = np.random.poisson(lam)
-        for _ in range(num_arrivals):
-            t = hour * 60 + np.random.uniform(0, 60)
-            origin, destination = np.random.choice(all_nodes, 2, replace=False)
-            schedule_event(t, "vehicle_arrival", (origin, destination))
+        if self.incidents_enabled:
+            for inc_time, inc_type, arc in self.generate_daily_incidents():
+                self.schedule_event(inc_time, inc_type, arc)
+
+        handlers = self.handlers
+        fes = self.FES
+        while fes:
+            time, _, event_type, data = fes.pop()
+            handlers[event_type](time, data)
 
-    for inc_time, inc_type, edge in generate_daily_incidents(graph):
-        schedule_event(inc_time, inc_type, edge)
+        self.delayed_vehicle_count = self.delayed_vehicle_series.counts().tolist()
+        self.active_incident_count = self.active_incident_series.counts().tolist()
+        return self.vehicle_stats, self.delayed_vehicle_count
 
-    while FES:
-        time, _, event_type, data = heapq.heappop(FES)
-        process_event(time, event_type, data, graph)
 
-    return vehicle_stats, delayed_vehicle_count
+def run_discrete_event_sim(graph, seed=None, incidents=True, event_set=HeapEventSet,
+                           od_weights=None, reroute=False, incident_rates=None,
+                           arrival_process=None):
+    """Run one replication; returns the finished Simulation."""
+    sim = Simulation(graph, seed, incidents, incident_rates, event_set=event_set,
+                     od_weights=od_weights, reroute=reroute, arrival_process=arrival_process)
+    sim.run()
+    return sim
 
 #Question 3.1
 def q3_1(vehicle_stats):
     print("Question 3.1")
-    travel_times = [v['travel_time'] for v in vehicle_stats]
-    delay_times = [v['delay_time'] for v in vehicle_stats]
-    incident_counts = [v['incidents'] for v in vehicle_stats]
+    travel_times = vehicle_stats.travel_time
+    delay_times = vehicle_stats.delay_time
+    incident_counts = vehicle_stats.incidents
 
 
     print(f"Total vehicles: {len(vehicle_stats)}")
@@ -257,8 +385,8 @@ def q3_4(delayed_vehicle_count):
 #Question 3.5
 def q3_5(ab_car_stats, ab_car_baseline=None):
     print("Question 3.5")
-    travel_times = [v['travel_time'] for v in ab_car_stats]
-    delay_times = [v['delay_time'] for v in ab_car_stats]
+    travel_times = ab_car_stats.travel_time
+    delay_times = ab_car_stats.delay_time
 
 
     print(f"Trips from A to B: {len(travel_times)}")
@@ -282,15 +410,22 @@ def q3_5(ab_car_stats, ab_car_baseline=None):
 
 
 if __name__ == "__main__":
-    random.seed(42)
-    np.random.seed(42)
-
     G = nx.read_gml(GML_FILE)
-    vehicle_stats, delayed_vehicle_count = run_discrete_event_sim(G)
-
-
-    q3_1(vehicle_stats)
-    q3_2(delayed_vehicle_count)
-    q3_3(active_incident_count)
-    q3_4(delayed_vehicle_count)
-    q3_5(ab_car_stats)
\ No newline at end of file
+    network = CompiledNetwork(G)
+    sim = run_discrete_event_sim(network, seed=42)
+    # same seed without incidents: common random numbers for the baseline in Q3.5
+    baseline = run_discrete_event_sim(network, seed=42, incidents=False)
+    # same seed with rerouting around active incidents
+    rerouted = run_discrete_event_sim(network, seed=42, reroute=True)
+
+
+    q3_1(sim.vehicle_stats)
+    q3_2(sim.delayed_vehicle_count)
+    q3_3(sim.active_incident_count)
+    q3_4(sim.delayed_vehicle_count)
+    q3_5(sim.ab_car_stats, baseline.ab_car_stats.travel_time)
+
+    print("Rerouting")
+    for label, s in [("Fixed routes", sim), ("Rerouting", rerouted)]:
+        print(f"{label:<14} mean travel time: {np.mean(s.vehicle_stats.travel_time):.2f} min, "
+              f"mean delay time: {np.mean(s.vehicle_stats.delay_time):.2f} min")
\ No newline at end of file
@@ -0,0 +1,216 @@
+'''
+Arrival streams for the traffic simulations.
+
+Vehicles arrive according to a nonhomogeneous Poisson process with a
+piecewise-constant or piecewise-linear rate function (ArrivalProcess). It
+precomputes the cumulative intensity Lambda(t) at the breakpoints; the
+arrival times in any interval then come from one Poisson draw and one
+vectorized inversion of Lambda at sorted uniforms (the arrival times of a
+Poisson process with intensity Lambda are Lambda^-1 of those of a unit-rate
+process), so a whole day takes one draw. Thinning of a homogeneous process
+is available as an alternative sampler.
+
+Instead of creating all arrivals of the horizon before the first event,
+ArrivalProcess.times() is a generator that draws the arrivals of one hour
+only when the previous hour has been consumed, and yields them in time
+order. The simulation keeps just the next arrival in its future event set,
+so the event set stays small, and with cycles=float('inf') the rate profile
+repeats day after day, so the horizon can be open-ended.
+ArrivalProcess.batches() yields the same arrivals as one sorted array per
+hour, for callers that draw further per-vehicle attributes (e.g. OD pairs)
+in batch.
+'''
+
+import numpy as np
+
+
+class ArrivalProcess :
+
+    '''
+    Constructor for this ArrivalProcess class; see also piecewise_constant()
+    and piecewise_linear().
+
+    Args:
+            knots (sequence of float): breakpoints t_0 < ... < t_K (minutes).
+            values (sequence of float): arrival rate (per minute): K values
+            (rate on [t_k, t_k+1)) for kind 'constant', K + 1 values (rate at
+            t_k, linear in between) for kind 'linear'.
+            kind (str): 'constant' or 'linear'.
+
+    The process lives on [t_0, t_K).
+    '''
+
+    def __init__(self, knots, values, kind='constant'):
+        t = np.asarray(knots, dtype=float)
+        v = np.asarray(values, dtype=float)
+        if np.any(np.diff(t) <= 0):
+            raise ValueError('knots must be increasing')
+        if np.any(v < 0):
+            raise ValueError('rates must be non-negative')
+        dt = np.diff(t)
+        if kind == 'constant':
+            if len(v) != len(dt):
+                raise ValueError(f'{len(dt)} rates needed for {len(t)} knots, got {len(v)}')
+            slope = np.zeros_like(dt)
+        elif kind == 'linear':
+            if len(v) != len(t):
+                raise ValueError(f'{len(t)} rates needed for {len(t)} knots, got {len(v)}')
+            slope = np.diff(v) / dt
+            v = v[:-1]
+        else:
+            raise ValueError(f"kind must be 'constant' or 'linear', not {kind!r}")
+        self.kind = kind
+        self.knots = t
+        self._rate = v          # rate at the start of every segment
+        self._slope = slope     # rate increase per minute within every segment
+        # cumulative-intensity table: Lambda(t_k)
+        self.cumulative_table = np.concatenate(([0.0], np.cumsum(v * dt + 0.5 * slope * dt ** 2)))
+        self.max_rate = float(max(v.max(), (v + slope * dt).max()))
+        # piecewise constant: t = offset_k + u / rate_k on segment k
+        self._inv_rate = np.divide(1.0, v, out=np.zeros_like(v), where=v > 0)
+        self._offset = t[:-1] - self.cumulative_table[:-1] * self._inv_rate
+
+    @classmethod
+    def piecewise_constant(cls, rates, period=60.0):
+        '''
+        The step function with rates[h] arrivals per period during period h
+        (e.g. HOURLY_RATES with period=60 minutes).
+        '''
+        knots = np.arange(len(rates) + 1) * period
+        return cls(knots, np.asarray(rates, dtype=float) / period, 'constant')
+
+    @classmethod
+    def piecewise_linear(cls, rates, period=60.0):
+        '''
+        A smooth version of the step function: linear interpolation of
+        rates[h] / period between the midpoints of the periods, constant in
+        the first and last half period.
+        '''
+        rates = np.asarray(rates, dtype=float) / period
+        mids = (np.arange(len(rates)) + 0.5) * period
+        knots = np.concatenate(([0.0], mids, [len(rates) * period]))
+        values = np.concatenate(([rates[0]], rates, [rates[-1]]))
+        return cls(knots, values, 'linear')
+
+    @classmethod
+    def hourly(cls, rates, smooth=False, period=60.0):
+        '''
+        The arrival process with rates[h] arrivals per period during period
+        h: the step function (piecewise_constant), or with smooth=True the
+        piecewise-linear profile between the midpoints of the periods
+        (piecewise_linear).
+        '''
+        return (cls.piecewise_linear if smooth else cls.piecewise_constant)(rates, period)
+
+    @property
+    def start(self):
+        return float(self.knots[0])
+
+    @property
+    def end(self):
+        return float(self.knots[-1])
+
+    @property
+    def expected_count(self):
+        '''
+        Expected number of arrivals in [t_0, t_K), Lambda(t_K).
+        '''
+        return float(self.cumulative_table[-1])
+
+    def _segment(self, t):
+        return np.clip(np.searchsorted(self.knots, t, side='right') - 1, 0, len(self._rate) - 1)
+
+    def rate(self, t):
+        '''
+        The arrival rate (per minute) at time(s) t.
+        '''
+        k = self._segment(t)
+        return self._rate[k] + self._slope[k] * (np.asarray(t) - self.knots[k])
+
+    def cumulative(self, t):
+        '''
+        The cumulative intensity Lambda(t): expected arrivals in [t_0, t).
+        '''
+        t = np.clip(t, self.knots[0], self.knots[-1])
+        k = self._segment(t)
+        s = t - self.knots[k]
+        return self.cumulative_table[k] + self._rate[k] * s + 0.5 * self._slope[k] * s ** 2
+
+    def inverse_cumulative(self, u, is_sorted=False):
+        '''
+        The time t with Lambda(t) = u, element-wise (u in [0, Lambda(t_K)]).
+        With is_sorted (u increasing) the segments are found by counting the
+        u per segment instead of a binary search per element.
+        '''
+        u = np.asarray(u, dtype=float)
+        table = self.cumulative_table
+        if is_sorted:
+            bounds = np.searchsorted(u, table[1:-1], side='left')
+            counts = np.diff(np.concatenate(([0], bounds, [len(u)])))
+            take = lambda a: np.repeat(a, counts)
+        else:
+            k = np.clip(np.searchsorted(table, u, side='right') - 1, 0, len(self._rate) - 1)
+            take = lambda a: a[k]
+        if self.kind == 'constant':
+            return take(self._offset) + u * take(self._inv_rate)
+        r, b = take(self._rate), take(self._slope)
+        du = u - take(table[:-1])
+        # root of r s + b s^2 / 2 = du, in a form that is stable for b = 0
+        denom = r + np.sqrt(np.maximum(r * r + 2.0 * b * du, 0.0))
+        s = np.divide(2.0 * du, denom, out=np.zeros_like(du), where=denom > 0)
+        return take(self.knots[:-1]) + s
+
+    def sample(self, rng, t0=None, t1=None):
+        '''
+        Returns the sorted arrival times in [t0, t1) (default: the whole
+        horizon) from one Poisson draw and one vectorized inversion.
+        '''
+        t0 = self.start if t0 is None else t0
+        t1 = self.end if t1 is None else t1
+        lam0, lam1 = self.cumulative(np.array([t0, t1])).tolist()
+        return self._sample_between(rng, lam0, lam1)
+
+    def _sample_between(self, rng, lam0, lam1):
+        n = int(rng.poisson(lam1 - lam0))
+        u = np.sort(rng.uniform(lam0, lam1, n))
+        return self.inverse_cumulative(u, is_sorted=True)
+
+    def sample_thinning(self, rng):
+        '''
+        Returns the sorted arrival times of the whole horizon by thinning a
+        homogeneous process with rate max_rate (vectorized).
+        '''
+        n = int(rng.poisson(self.max_rate * (self.end - self.start)))
+        t = np.sort(rng.uniform(self.start, self.end, n))
+        keep = rng.uniform(0.0, self.max_rate, n) < self.rate(t)
+        return t[keep]
+
+    def batches(self, rng, period=60.0, cycles=1):
+        '''
+        Yields the sorted arrival times per period, each from one draw, so
+        arrivals can be generated lazily.
+
+        Args:
+                period (float): length of one batch in minutes.
+                cycles (int or float): number of times the rate profile is
+                run through, each cycle shifted by end - start; pass
+                float('inf') for an open-ended horizon.
+        '''
+        bounds = np.append(np.arange(self.start, self.end, period), self.end)
+        lam = self.cumulative(bounds).tolist()
+        length = self.end - self.start
+        cycle = 0
+        while cycle < cycles:
+            shift = cycle * length
+            for lam0, lam1 in zip(lam[:-1], lam[1:]):
+                times = self._sample_between(rng, lam0, lam1)
+                yield times + shift if shift else times
+            cycle += 1
+
+    def times(self, rng, period=60.0, cycles=1):
+        '''
+        Yields the arrival times one by one, as floats, drawing one period
+        at a time (see batches).
+        '''
+        for times in self.batches(rng, period, cycles):
+            yield from times.tolist()
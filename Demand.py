@@ -0,0 +1,68 @@
+'''
+Origin-destination sampling for the traffic simulations.
+
+Drawing the OD pair of every vehicle with its own rng.choice(n, 2,
+replace=False) call costs a Python call (and a temporary permutation) per
+vehicle. An ODSampler draws the OD pairs of a whole batch of vehicles as two
+integer index arrays in one go, always with origin != destination.
+
+Without weights the pair is uniform over the n (n - 1) ordered pairs of
+distinct nodes: the origin is uniform and the destination is the origin
+shifted by a uniform 1..n-1 (mod n). With weights the pair is drawn by
+inversion from the cumulative distribution of the n x n OD matrix, whose
+diagonal is ignored.
+'''
+
+import numpy as np
+
+
+class ODSampler :
+
+    '''
+    Constructor for this ODSampler class.
+
+    Args:
+            n_nodes (int): number of nodes; nodes are identified by their
+            index 0..n_nodes-1.
+            weights (array, optional): None for uniform OD pairs, a vector of
+            n_nodes node weights (pair (i, j) gets weight w_i w_j, as in a
+            gravity model) or an n_nodes x n_nodes OD matrix.
+    '''
+
+    def __init__(self, n_nodes, weights=None):
+        if n_nodes < 2:
+            raise ValueError('OD pairs need at least two nodes')
+        self.n_nodes = n_nodes
+        self._cdf = None
+        if weights is not None:
+            w = np.asarray(weights, dtype=float)
+            if w.shape == (n_nodes,):
+                w = np.outer(w, w)
+            elif w.shape != (n_nodes, n_nodes):
+                raise ValueError(f'OD weights must have shape ({n_nodes},) or ({n_nodes}, {n_nodes}), got {w.shape}')
+            if (w < 0).any():
+                raise ValueError('OD weights must be non-negative')
+            w = w.copy()
+            np.fill_diagonal(w, 0.0)
+            flat = w.ravel()
+            if not flat.any():
+                raise ValueError('OD weights are zero for every pair of distinct nodes')
+            self._cdf = np.cumsum(flat)
+            self._last = int(np.flatnonzero(flat)[-1])
+
+    def sample(self, size, rng):
+        '''
+        Returns (origins, destinations): two integer arrays of length 'size'
+        with origins[k] != destinations[k].
+
+        'rng' is a numpy Generator or anything with the same integers() and
+        random() methods (e.g. a VarianceReduction.UniformGenerator).
+        '''
+        n = self.n_nodes
+        if self._cdf is None:
+            origins = rng.integers(0, n, size)
+            destinations = (origins + rng.integers(1, n, size)) % n
+            return origins, destinations
+        u = rng.random(size) * self._cdf[-1]
+        k = np.minimum(np.searchsorted(self._cdf, u, side='right'), self._last)
+        return np.divmod(k, n)
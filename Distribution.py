@@ -5,105 +5,254 @@ when one samples only one random number at a time. It is extremely fast,
 however, when one samples multiple random numbers simultaneously.
 For this reason, we have created this class that acts somewhat as a wrapper
 around the scipy probability distributions. It will make sure that random
-numbers are always generated in batches of n = 10000, and the rvs() function
-simply returns the next random number from this list (and resamples when necessary).
+numbers are always generated in batches (of n = 10000 by default), and the
+rvs() function simply returns the next random number from this batch (and
+resamples when necessary).
+
+The batches are drawn from a numpy random Generator. For the distributions
+used in the simulations (normal, gamma, exponential, uniform and Poisson) the
+Generator is called directly, which skips the overhead of scipy's rvs().
+
+RandomStreams hands out independent, reproducible random number streams, one
+per named stochastic component of a model (arrivals, routing, link travel
+times, incidents, ...). Using the same seed for two scenarios gives every
+component the same stream in both, which enables common random numbers.
+
+A Distribution can be saved to and loaded from a small JSON file with the
+scipy name and parameters of its random variable (e.g. a fitted incident
+duration distribution, see DistributionFitting.py).
 
 @author: Marko Boon
 '''
 
+import json
+import zlib
+
+import numpy as np
+from scipy import stats
+
+
+# scipy distribution name -> function(rng, shape args, loc, scale, n)
+_FAST_SAMPLERS = {
+    'norm'    : lambda rng, args, loc, scale, n: rng.normal(loc, scale, n),
+    'gamma'   : lambda rng, args, loc, scale, n: loc + rng.gamma(args[0], scale, n),
+    'expon'   : lambda rng, args, loc, scale, n: loc + rng.exponential(scale, n),
+    'uniform' : lambda rng, args, loc, scale, n: rng.uniform(loc, loc + scale, n),
+    'poisson' : lambda rng, args, loc, scale, n: int(loc) + rng.poisson(args[0], n),
+}
+
 
 class Distribution :
 
-    n = 10000 # standard random numbers to generate
+    n = 10000 # default number of random numbers to generate in one batch
 
     '''
     Constructor for this Distribution class.
-    
+
     Args:
-            dist (scipy.stats random variable): A random variable from 
+            dist (scipy.stats random variable): A random variable from
             the scipy stats libary.
-    
+            rng (numpy Generator, seed or SeedSequence, optional): the source
+            of random numbers. By default the random state of 'dist' is used
+            (numpy's global random state unless it was set).
+            n (int, optional): initial batch size.
+
     Attributes:
-            dist (scipy.stats random variable): A random variable from 
+            dist (scipy.stats random variable): A random variable from
             the scipy stats libary.
-            n (int): a number indicating how many random numbers should 
-            be generated in one batch
-            randomNumbers: a list of n random numbers generated from 'dist'
-            idx (int): a number keeping track of how many random numbers 
+            rng (numpy Generator): the random number generator
+            n (int): a number indicating how many random numbers should
+            be generated in one batch. It grows when a single request
+            asks for more than n numbers.
+            randomNumbers: a numpy array of n random numbers generated from 'dist'
+            idx (int): a number keeping track of how many random numbers
             have been sampled
-    
+
     '''
 
-    def __init__(self, dist):
+    def __init__(self, dist, rng=None, n=None):
         self.dist = dist
-        self.resample()
-    
+        if n is not None:
+            self.n = n
+        self._sampler = self._fast_sampler()
+        self.setRandomState(dist.random_state if rng is None else rng)
+
+    def setRandomState(self, rng):
         '''
         Sets the random state of the (internal) random number generator.
         This is typically used to have control over the random seeds.
+        Accepts a numpy Generator or RandomState, or anything that
+        numpy.random.default_rng accepts (int seed, SeedSequence).
         '''
-    
-    def setRandomState(self, rng):
+        if not isinstance(rng, (np.random.Generator, np.random.RandomState)):
+            rng = np.random.default_rng(rng)
+        self.rng = rng
         self.dist.random_state = rng
         self.resample()
-    
-        
+
+
     def __str__(self):
         return str(self.dist)
-    
+
+    def to_dict(self):
+        '''
+        Returns the scipy name and parameters of 'dist' as a JSON-friendly dict.
+        '''
+        args, loc, scale = self.dist.dist._parse_args(*self.dist.args, **self.dist.kwds)[:3]
+        if isinstance(self.dist.dist, stats.rv_discrete):
+            loc = int(loc)  # keeps the samples of discrete distributions integer
+        else:
+            loc = float(loc)
+        return {'distribution': self.dist.dist.name,
+                'shapes': [float(a) for a in args], 'loc': loc, 'scale': float(scale)}
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    @classmethod
+    def from_dict(cls, spec, rng=None, n=None):
+        dist = getattr(stats, spec['distribution'])
+        if isinstance(dist, stats.rv_discrete):
+            kwds = {'loc': int(spec['loc'])}
+        else:
+            kwds = {'loc': spec['loc']}
+            if 'scale' in spec:
+                kwds['scale'] = spec['scale']
+        return cls(dist(*spec['shapes'], **kwds), rng=rng, n=n)
+
+    @classmethod
+    def load(cls, path, rng=None, n=None):
+        '''
+        Returns the Distribution saved in 'path' (see save), drawing its
+        random numbers from 'rng'.
+        '''
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f), rng=rng, n=n)
+
+    def _fast_sampler(self):
+        '''
+        Returns a function that draws a batch directly from the Generator, or
+        None if 'dist' is not one of the distributions in _FAST_SAMPLERS.
+        '''
+        sampler = _FAST_SAMPLERS.get(getattr(self.dist.dist, 'name', None))
+        if sampler is None:
+            return None
+        args, loc, scale = self.dist.dist._parse_args(*self.dist.args, **self.dist.kwds)[:3]
+        return lambda rng, n: sampler(rng, args, loc, scale, n)
+
+    def _draw(self, n):
+        if self._sampler is not None:
+            return self._sampler(self.rng, n)
+        return self.dist.rvs(size=n, random_state=self.rng)
+
     def resample(self):
-        self.randomNumbers = self.dist.rvs(size=self.n)
+        self.randomNumbers = self._draw(self.n)
+        self._list = None
         self.idx = 0
-    
+
+    def _refill(self, size):
+        '''
+        Draws a new batch of n random numbers, keeping the numbers of the
+        current batch that were not used yet (so that none are discarded).
+        '''
+        while size > self.n :
+            self.n *= 10
+        rest = self.randomNumbers[self.idx:]
+        self.randomNumbers = np.concatenate((rest, self._draw(self.n - len(rest))))
+        self._list = None
+        self.idx = 0
+
     def rvs(self, size=1):
         '''
-        A function that returns n (=1 by default) random numbers from 
+        A function that returns n (=1 by default) random numbers from
         the specified distribution.
-        
+
         Returns:
-            One random number (float) if n=1, and a list of n random numbers 
-            otherwise.
+            One random number (float, or int for discrete distributions) if
+            size=1, and a numpy array of size random numbers otherwise. The
+            array is a view on the current batch (no copy is made).
         '''
-        if self.idx >= self.n - size :
-            while size > self.n :
-                self.n *= 10
-            self.resample()
+        idx = self.idx
+        if idx + size > len(self.randomNumbers) :
+            self._refill(size)
+            idx = 0
+        self.idx = idx + size
         if size == 1 :
-            rs = self.randomNumbers[self.idx]
-        else :
-            rs = self.randomNumbers[self.idx:(self.idx + size)]
-        self.idx += size
-        return rs
+            if self._list is None :
+                self._list = self.randomNumbers.tolist()
+            return self._list[idx]
+        return self.randomNumbers[idx:(idx + size)]
 
     def mean(self):
         return self.dist.mean()
-    
+
     def std(self):
         return self.dist.std()
-    
+
     def var(self):
         return self.dist.var()
-    
+
     def cdf(self, x):
         return self.dist.cdf(x)
-    
+
     def pdf(self, x):
         return self.dist.pdf(x)
-    
+
     def sf(self, x):
         return self.dist.sf(x)
-    
+
     def ppf(self, x):
         return self.dist.ppf(x)
-    
+
     def moment(self, n):
         return self.dist.moment(n)
-    
+
     def median(self):
         return self.dist.median()
-    
+
     def interval(self, alpha):
         return self.dist.interval(alpha)
-    
 
 
+class RandomStreams :
+
+    '''
+    Constructor for this RandomStreams class.
+
+    Args:
+            seed (int or numpy SeedSequence): the seed of the replication.
+
+    The stream of a component only depends on the seed and the name of the
+    component, not on the order in which streams are requested or on which
+    other components exist. A model without incidents therefore uses exactly
+    the same arrival and routing streams as the same model with incidents.
+    '''
+
+    def __init__(self, seed=None):
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed = seed
+        self._generators = {}
+
+    def _child(self, name):
+        key = zlib.crc32(name.encode())
+        return np.random.SeedSequence(self.seed.entropy,
+                                      spawn_key=self.seed.spawn_key + (key,),
+                                      pool_size=self.seed.pool_size)
+
+    def generator(self, name):
+        '''
+        Returns the numpy Generator of component 'name' (the same object on
+        every call).
+        '''
+        if name not in self._generators:
+            self._generators[name] = np.random.default_rng(self._child(name))
+        return self._generators[name]
+
+    def distribution(self, name, dist, n=None):
+        '''
+        Returns a Distribution for scipy random variable 'dist' that draws its
+        random numbers from the stream of component 'name'.
+        '''
+        return Distribution(dist, rng=self.generator(name), n=n)
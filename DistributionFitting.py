@@ -0,0 +1,152 @@
+'''
+Fitting candidate distributions to data, e.g. incident durations (FileDuur).
+
+Every candidate is fitted by maximum likelihood (scipy's fit), started from
+method-of-moments values so that the optimizer needs few iterations, and is
+scored with the Kolmogorov-Smirnov statistic (and p-value), the
+Anderson-Darling statistic and the AIC. The candidates (and, with
+fit_groups, the groups of data, e.g. per road segment or per hour) are
+fitted in parallel on a process pool; n_workers=1 fits in this process.
+
+The best fit (lowest AIC) is saved as a Distribution (see Distribution.save)
+that the simulation loads with Distribution.load.
+'''
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Tuple
+
+import numpy as np
+from scipy import special, stats
+
+from Distribution import Distribution
+
+
+CANDIDATES = ('expon', 'gamma', 'lognorm', 'weibull_min')
+
+
+class FitResult(NamedTuple):
+    name: str
+    shapes: Tuple[float, ...]
+    loc: float
+    scale: float
+    loglik: float
+    aic: float
+    ks: float
+    ks_pvalue: float
+    ad: float
+
+    def frozen(self):
+        return getattr(stats, self.name)(*self.shapes, loc=self.loc, scale=self.scale)
+
+
+def start_values(name, data, loc=0.0):
+    '''
+    Method-of-moments (shapes, scale) of candidate 'name' for data - loc.
+    '''
+    x = np.asarray(data, dtype=float) - loc
+    mean, var = x.mean(), x.var()
+    if name == 'expon':
+        return (), mean
+    if name == 'gamma':
+        return (mean ** 2 / var,), var / mean
+    if name == 'lognorm':
+        s2 = math.log1p(var / mean ** 2)
+        return (math.sqrt(s2),), mean / math.sqrt(1.0 + var / mean ** 2)
+    if name == 'weibull_min':
+        k = (math.sqrt(var) / mean) ** -1.086  # Justus' approximation
+        return (k,), mean / special.gamma(1.0 + 1.0 / k)
+    return None, None  # no MoM values: scipy's default start
+
+
+def anderson_darling(data, dist):
+    '''
+    Anderson-Darling statistic A^2 of the data for the frozen distribution.
+    '''
+    x = np.sort(np.asarray(data, dtype=float))
+    n = len(x)
+    i = np.arange(1, n + 1)
+    return float(-n - np.mean((2 * i - 1) * (dist.logcdf(x) + dist.logsf(x[::-1]))))
+
+
+def fit_one(data, name, floc=0.0):
+    '''
+    Fits candidate 'name' to the data (with the location fixed at floc, or
+    free if floc is None) and returns its FitResult. With a fixed location,
+    observations <= floc (e.g. zero durations) are left out: the candidates
+    have no positive density there. A candidate that cannot be fitted gets an
+    AIC of inf.
+    '''
+    data = np.asarray(data, dtype=float)
+    if floc is not None:
+        data = data[data > floc]
+    dist = getattr(stats, name)
+    shapes, scale = start_values(name, data, 0.0 if floc is None else floc)
+    kwds = {} if floc is None else {'floc': floc}
+    if scale is not None and np.isfinite(scale) and scale > 0:
+        kwds['scale'] = scale
+    try:
+        params = dist.fit(data, *(shapes or ()), **kwds)
+    except (ValueError, RuntimeError, stats.FitError):
+        nan = float('nan')
+        return FitResult(name, (), nan, nan, -math.inf, math.inf, nan, nan, nan)
+    *shape_params, loc, scale = (float(p) for p in params)
+    frozen = dist(*shape_params, loc=loc, scale=scale)
+    loglik = float(np.sum(frozen.logpdf(data)))
+    k = len(params) - (floc is not None)
+    ks = stats.kstest(data, frozen.cdf)
+    return FitResult(name, tuple(shape_params), loc, scale, loglik, 2 * k - 2 * loglik,
+                     float(ks.statistic), float(ks.pvalue), anderson_darling(data, frozen))
+
+
+def _fit_task(task):
+    return fit_one(*task)
+
+
+def _map(tasks, n_workers):
+    if n_workers == 1:
+        return list(map(_fit_task, tasks))
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        return list(pool.map(_fit_task, tasks, chunksize=max(1, len(tasks) // (4 * (n_workers or 8)))))
+
+
+def fit_candidates(data, candidates=CANDIDATES, floc=0.0, n_workers=None):
+    '''
+    Fits every candidate to the data in parallel; returns the FitResults
+    sorted by AIC (best first).
+    '''
+    data = np.asarray(data, dtype=float)
+    results = _map([(data, name, floc) for name in candidates], n_workers)
+    return sorted(results, key=lambda r: r.aic)
+
+
+def fit_groups(groups, candidates=CANDIDATES, floc=0.0, n_workers=None):
+    '''
+    Fits every candidate to every group of data ({key: data}, e.g. one group
+    per road segment or per hour) in one parallel pass; returns
+    {key: FitResults sorted by AIC}.
+    '''
+    keys = list(groups)
+    tasks = [(np.asarray(groups[key], dtype=float), name, floc)
+             for key in keys for name in candidates]
+    results = _map(tasks, n_workers)
+    m = len(candidates)
+    return {key: sorted(results[g * m:(g + 1) * m], key=lambda r: r.aic)
+            for g, key in enumerate(keys)}
+
+
+def print_fits(results):
+    print(f"{'distribution':<14}{'AIC':>12}{'KS':>9}{'KS p':>9}{'AD':>10}  parameters")
+    for r in results:
+        params = ', '.join(f'{p:.3f}' for p in (*r.shapes, r.loc, r.scale))
+        print(f'{r.name:<14}{r.aic:12.1f}{r.ks:9.4f}{r.ks_pvalue:9.4f}{r.ad:10.2f}  ({params})')
+
+
+def save_best(results, path):
+    '''
+    Saves the best fit (lowest AIC) as a Distribution and returns it.
+    '''
+    best = min(results, key=lambda r: r.aic)
+    dist = Distribution(best.frozen())
+    dist.save(path)
+    return dist
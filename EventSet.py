@@ -0,0 +1,110 @@
+'''
+Future event sets for the discrete-event simulations.
+
+An event is a tuple whose first element is the event time, e.g.
+(time, counter, event_type, data); events are ordered like tuples. Every
+future event set has the same small interface:
+
+    fes.push(event)     add an event
+    fes.pop()           remove and return the event with the smallest time
+    len(fes)            number of events (so "while fes:" works)
+
+HeapEventSet is a binary heap (heapq), O(log n) per operation.
+CalendarQueue spreads the events over time buckets ("days" of a "year")
+and gives O(1) amortized push and pop when event times are roughly uniform
+over time, as the arrivals within an hour are.
+'''
+
+import heapq
+
+
+class HeapEventSet :
+
+    def __init__(self):
+        self._heap = []
+
+    def push(self, event):
+        heapq.heappush(self._heap, event)
+
+    def pop(self):
+        return heapq.heappop(self._heap)
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class CalendarQueue :
+
+    '''
+    Constructor for this CalendarQueue class.
+
+    Args:
+            bucket_width (float): time span of one bucket. It is re-estimated
+            from the events whenever the queue is resized.
+            n_buckets (int): initial number of buckets.
+
+    Events with time t go into bucket int(t // bucket_width) % n_buckets;
+    each bucket is a small heap. pop() walks through the buckets in time
+    order, starting from the bucket of the last popped event. The number of
+    buckets is doubled (halved) when the queue holds more than 2 (fewer than
+    1/2) events per bucket, and then all events are redistributed.
+    '''
+
+    def __init__(self, bucket_width=1.0, n_buckets=16):
+        self._size = 0
+        self._setup(bucket_width, n_buckets, 0)
+
+    def _setup(self, width, n_buckets, current):
+        self._width = width
+        self._n_buckets = n_buckets
+        self._buckets = [[] for _ in range(n_buckets)]
+        self._current = current  # absolute bucket number of the last popped event
+        self._grow_at = 2 * n_buckets
+        self._shrink_at = n_buckets // 2 if n_buckets > 16 else -1
+
+    def push(self, event):
+        k = int(event[0] // self._width)
+        heapq.heappush(self._buckets[k % self._n_buckets], event)
+        if k < self._current:  # earlier than the last popped event
+            self._current = k
+        self._size += 1
+        if self._size > self._grow_at:
+            self._resize(2 * self._n_buckets)
+
+    def pop(self):
+        if self._size == 0:
+            raise IndexError('pop from an empty CalendarQueue')
+        width, n_buckets, buckets = self._width, self._n_buckets, self._buckets
+        k = self._current
+        for _ in range(n_buckets):
+            bucket = buckets[k % n_buckets]
+            if bucket and bucket[0][0] // width <= k:
+                return self._pop_from(bucket, k)
+            k += 1
+        # a whole year without events: jump directly to the earliest event
+        bucket = min((b for b in buckets if b), key=lambda b: b[0])
+        return self._pop_from(bucket, int(bucket[0][0] // width))
+
+    def _pop_from(self, bucket, k):
+        self._current = k
+        self._size -= 1
+        event = heapq.heappop(bucket)
+        if self._size < self._shrink_at:
+            self._resize(self._n_buckets // 2)
+        return event
+
+    def _resize(self, n_buckets):
+        events = [e for b in self._buckets for e in b]
+        if len(events) > 1:
+            times = [e[0] for e in events]
+            span = max(times) - min(times)
+            width = 3.0 * span / len(events) if span > 0 else self._width
+        else:
+            width = self._width
+        current = int(min(events)[0] // width) if events else 0
+        self._setup(width, n_buckets, current)
+        for e in events:
+            heapq.heappush(self._buckets[int(e[0] // width) % n_buckets], e)
+
+    def __len__(self):
+        return self._size
@@ -1,7 +1,9 @@
 import matplotlib.pyplot as plt
 import numpy as np
 import networkx as nx
-from shapely.geometry.linestring import LineString
+from matplotlib.collections import LineCollection
+
+from NetworkCache import load_network
 
 
 
@@ -151,37 +153,23 @@ plt.show()
 ################################
 
 
-def linestring_destringizer(x):
-    '''
-    Takes string x and converts it to an object.
-    In this case, only LineStrings will be converted.
-
-    Parameters
-    ----------
-    x : str
-        The string that will be converted.
-
-    '''
-    if x[0:10] == 'LINESTRING':  # convert to linestring
-        s1 = x[12:-1].split(', ')
-        pts = []
-        for p in s1:
-            pt = p.split(' ')
-            pts.append((float(pt[0]),float(pt[1])))
-        return LineString(pts)
-
-    return str(x)
+# The first call parses the GML file and writes a binary cache
+# (networkNLcomplete.gml.cache); later runs load that cache in well under a
+# second. The LineString geometries stay packed coordinate arrays:
+# networkNL.coords(e) gives the points of edge e, networkNL.geometry(e) a
+# shapely LineString (only created when asked for). The plot and the route
+# below work on the cached arrays; networkNL.to_networkx() builds the full
+# networkx graph (slow) for code that really needs one.
+networkNL = load_network('networkNLcomplete.gml')
 
+# one straight line per edge between its end points, drawn in one go
+nodeXY = np.column_stack((networkNL.node_attr['x'], networkNL.node_attr['y']))
+edgeLines = np.stack((nodeXY[networkNL.edge_u], nodeXY[networkNL.edge_v]), axis=1)
 
-networkGraph = nx.read_gml('networkNLcomplete.gml', destringizer=linestring_destringizer)
-
-
-posDict2 = {}
-for k in networkGraph.nodes:
-    posDict2[k] = (networkGraph.nodes[k]['x'], networkGraph.nodes[k]['y'])
-
-plt.figure(figsize=(10,10))
-nx.draw(networkGraph, pos=posDict2, node_size=0, arrows=False)
+fig, ax = plt.subplots(figsize=(10,10))
+ax.add_collection(LineCollection(edgeLines, linewidths=1))
+ax.autoscale()
+ax.axis('off')
 plt.show()
 
 
@@ -191,7 +179,7 @@ rt = nx.shortest_path(assignmentGraph,fromJunction,toJunction, weight='length')
 print(rt)
 
 # 2. full network graph
-rt2 = nx.shortest_path(networkGraph,fromJunction,toJunction, weight='length')
+rt2 = networkNL.shortest_path(fromJunction, toJunction, weight='length')
 print(rt2)
 
 
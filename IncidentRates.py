@@ -0,0 +1,148 @@
+'''
+Streaming estimation of hourly incident rates from the RWS traffic-jam files.
+
+HourlyRateEstimator reads any number of monthly CSV files in chunks and only
+keeps running counts: incidents per start hour (24) and per weekday x start
+hour (7 x 24), plus the set of observed days as exposure. Memory therefore
+does not grow with the number of rows or months.
+
+The estimate is a small versioned JSON rate table:
+
+    hourly[h]              incidents per hour during hour h of an average day
+    weekday_hourly[d][h]   the same for weekday d (Monday = 0)
+
+which the simulation (Question 3) reads with load_rate_table(). Build one with
+
+    python IncidentRates.py incident_rates.json 2024-11_rws_filedata.csv ...
+'''
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from RWSData import RWS_CSV_OPTIONS, file_hash
+
+
+RATE_TABLE_VERSION = 1
+
+_COLUMNS = ['DatumFileBegin', 'TijdFileBegin']
+
+
+class HourlyRateEstimator :
+
+    '''
+    Constructor for this HourlyRateEstimator class.
+
+    Args:
+            chunksize (int): number of CSV rows read at a time.
+
+    Attributes:
+            counts (numpy array): number of incidents per start hour
+            weekday_counts (numpy array): 7 x 24 incidents per weekday and hour
+            days (set): ordinal numbers of the observed days; a file counts
+            as observing every day from its first to its last start date
+    '''
+
+    def __init__(self, chunksize=100_000):
+        self.chunksize = chunksize
+        self.counts = np.zeros(24, dtype=np.int64)
+        self.weekday_counts = np.zeros((7, 24), dtype=np.int64)
+        self.days = set()
+        self.sources = []
+
+    def update(self, chunk):
+        '''
+        Adds a frame (or chunk) of raw RWS rows.
+        '''
+        dates = pd.to_datetime(chunk['DatumFileBegin'], format='%Y-%m-%d')
+        hours = (pd.to_timedelta(chunk['TijdFileBegin']) // pd.Timedelta(hours=1)).to_numpy()
+        weekdays = dates.dt.weekday.to_numpy()
+        self.counts += np.bincount(hours, minlength=24)
+        self.weekday_counts += np.bincount(weekdays * 24 + hours, minlength=7 * 24).reshape(7, 24)
+        return dates
+
+    def add_file(self, path):
+        '''
+        Adds all rows of one RWS CSV file, read in chunks.
+        '''
+        first = last = None
+        reader = pd.read_csv(path, usecols=_COLUMNS, chunksize=self.chunksize, **RWS_CSV_OPTIONS)
+        for chunk in reader:
+            dates = self.update(chunk)
+            if len(dates):
+                first = dates.min() if first is None else min(first, dates.min())
+                last = dates.max() if last is None else max(last, dates.max())
+        if first is not None:
+            self.days.update(range(first.toordinal(), last.toordinal() + 1))
+        self.sources.append({'file': os.path.basename(path), 'sha1': file_hash(path)})
+
+    def add_files(self, paths):
+        for path in paths:
+            self.add_file(path)
+        return self
+
+    def exposure(self):
+        '''
+        Returns (number of observed days, number of observed days per weekday).
+        '''
+        weekdays = np.bincount([(day - 1) % 7 for day in self.days], minlength=7)  # ordinal 1 is a Monday
+        return len(self.days), weekdays
+
+    def rate_table(self):
+        '''
+        Returns the rate table (a dict, see the module docstring).
+        '''
+        n_days, weekday_days = self.exposure()
+        if n_days == 0:
+            raise ValueError('No incidents have been read')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weekday_rates = self.weekday_counts / weekday_days[:, None]
+        return {
+            'version': RATE_TABLE_VERSION,
+            'unit': 'incidents per hour',
+            'sources': self.sources,
+            'days': n_days,
+            'weekday_days': weekday_days.tolist(),
+            'counts': self.counts.tolist(),
+            'weekday_counts': self.weekday_counts.tolist(),
+            'hourly': (self.counts / n_days).tolist(),
+            'weekday_hourly': np.where(weekday_days[:, None] > 0, weekday_rates, np.nan).tolist(),
+        }
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.rate_table(), f, indent=1)
+
+
+def load_rate_table(path, weekday=None):
+    '''
+    Returns the 24 hourly incident rates of the rate table in 'path': those
+    of an average day, or of the given weekday (Monday = 0).
+    '''
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'No incident rate table {path}; build it from the RWS files with '
+                                f'"python IncidentRates.py {path} <RWS csv files>" or Question 1')
+    with open(path, encoding='utf-8') as f:
+        table = json.load(f)
+    if table.get('version') != RATE_TABLE_VERSION:
+        raise ValueError(f"Rate table {path} has version {table.get('version')}, "
+                         f'expected {RATE_TABLE_VERSION}; rebuild it with IncidentRates.py')
+    if table.get('default'):
+        raise ValueError(f'Rate table {path} is a placeholder, not estimated from RWS data; build it '
+                         f'with "python IncidentRates.py {path} <RWS csv files>" or Question 1')
+    rates = table['hourly'] if weekday is None else table['weekday_hourly'][weekday]
+    if any(r != r for r in rates):  # NaN: weekday never observed
+        raise ValueError(f'Rate table {path} has no data for weekday {weekday}')
+    return rates
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        sys.exit('usage: python IncidentRates.py <rate table .json> <RWS csv> [<RWS csv> ...]')
+    estimator = HourlyRateEstimator().add_files(sys.argv[2:])
+    estimator.write(sys.argv[1])
+    n_days, _ = estimator.exposure()
+    print(f'{estimator.counts.sum()} incidents on {n_days} days -> {sys.argv[1]}')
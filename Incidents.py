@@ -0,0 +1,104 @@
+'''
+Per-edge index of incidents.
+
+A plain set of blocked edges cannot represent two overlapping incidents on
+the same edge: the first incident_end would clear the edge while the second
+incident is still active. IncidentIndex keeps a reference count per edge id,
+so "is this edge blocked now, and by how many incidents" is answered in O(1),
+and it keeps the time window of every known incident per edge, so future
+incident windows along a route can be queried.
+'''
+
+import math
+from bisect import bisect_right
+
+
+class IncidentIndex :
+
+    '''
+    Constructor for this IncidentIndex class.
+
+    Args:
+            n_edges (int): number of edges; edges are identified by their
+            id 0..n_edges-1 (edge ids or, for incidents that block one
+            direction only, arc ids; see CompiledNetwork).
+
+    Attributes:
+            active (list of int): number of active incidents per edge id
+            blocked (set): ids of the edges with at least one active incident
+            blocked_key (frozenset): frozen copy of blocked, rebuilt only
+            when the blocked set changes (e.g. a key for route caches)
+    '''
+
+    def __init__(self, n_edges):
+        self.active = [0] * n_edges
+        self.blocked = set()
+        self._blocked_key = frozenset()
+        self._windows = [[] for _ in range(n_edges)]
+        self._sorted = [True] * n_edges
+
+    def add_window(self, edge, start, end):
+        '''
+        Registers an incident on 'edge' during [start, end) for window queries.
+        This does not make the edge blocked; use start() and end() for that.
+        '''
+        windows = self._windows[edge]
+        if windows and start < windows[-1][0]:
+            self._sorted[edge] = False
+        windows.append((start, end))
+
+    def start(self, edge):
+        '''
+        An incident on 'edge' starts.
+        '''
+        self.active[edge] += 1
+        if edge not in self.blocked:
+            self.blocked.add(edge)
+            self._blocked_key = None
+
+    def end(self, edge):
+        '''
+        An incident on 'edge' ends. The edge stays blocked while other
+        incidents on it are still active.
+        '''
+        self.active[edge] -= 1
+        if self.active[edge] <= 0:
+            self.active[edge] = 0
+            if edge in self.blocked:
+                self.blocked.discard(edge)
+                self._blocked_key = None
+
+    @property
+    def blocked_key(self):
+        if self._blocked_key is None:
+            self._blocked_key = frozenset(self.blocked)
+        return self._blocked_key
+
+    def count(self, edge):
+        '''
+        Number of incidents currently active on 'edge'.
+        '''
+        return self.active[edge]
+
+    def is_blocked(self, edge):
+        return self.active[edge] > 0
+
+    def windows(self, edge, t_from, t_to=math.inf):
+        '''
+        Returns the (start, end) windows of the incidents on 'edge' that
+        overlap [t_from, t_to], sorted by start time.
+        '''
+        windows = self._windows[edge]
+        if not self._sorted[edge]:
+            windows.sort()
+            self._sorted[edge] = True
+        last = bisect_right(windows, (t_to, math.inf))
+        return [w for w in windows[:last] if w[1] > t_from]
+
+    def route_windows(self, edges, t_from, t_to=math.inf):
+        '''
+        Returns (edge, start, end) for every incident on one of the given
+        edges (e.g. the edges of a route) that overlaps [t_from, t_to].
+        '''
+        return [(edge, start, end) for edge in edges
+                for start, end in self.windows(edge, t_from, t_to)]
@@ -0,0 +1,193 @@
+'''
+Compact, integer-indexed representation of a road network for the simulation
+hot path.
+
+Looking up G.edges[(u, v)]['length'] in networkx goes through several nested
+dicts keyed by string node labels. A CompiledNetwork is built once from the
+graph (or directly from a GML file): nodes are numbered 0..n-1, edges
+0..m-1, edge attributes are stored in numpy arrays indexed by edge id and the
+shortest route between every pair of nodes is stored as an array of edge ids.
+Each edge has two directed arcs, 2 * edge (edge_u -> edge_v) and 2 * edge + 1
+(edge_v -> edge_u), so that something that affects one direction of a road
+only, like an incident, has its own id. IncidentRouter adds incident-aware
+next-hop routing on top of it.
+'''
+
+import networkx as nx
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+
+class CompiledNetwork :
+
+    '''
+    Constructor for this CompiledNetwork class.
+
+    Args:
+            G (networkx Graph): the road network; edges need a 'length'
+            attribute (meters) and may have a 'lanes' attribute.
+
+    Attributes:
+            labels (list): node label of every node index
+            index (dict): node index of every node label
+            names (list): 'name' attribute of every node index
+            edge_u, edge_v (numpy int arrays): end points of every edge id
+            length_km (numpy array): length of every edge id in km
+            lanes (numpy int array): number of lanes of every edge id (0 if unknown)
+            edge_id (numpy int array): n x n matrix with the id of the edge
+            between two nodes, -1 if there is none; in an undirected graph
+            both directions share the edge id (see arc())
+    '''
+
+    def __init__(self, G):
+        self.directed = G.is_directed()
+        self.labels = list(G.nodes)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.names = [G.nodes[label].get('name', str(label)) for label in self.labels]
+
+        edges = list(G.edges(data=True))
+        self.edge_u = np.array([self.index[u] for u, _, _ in edges], dtype=np.int32)
+        self.edge_v = np.array([self.index[v] for _, v, _ in edges], dtype=np.int32)
+        self.length_km = np.array([d['length'] for _, _, d in edges], dtype=float) / 1000.0
+        self.lanes = np.array([int(d.get('lanes', 0)) for _, _, d in edges], dtype=np.int32)
+
+        n = len(self.labels)
+        self.edge_id = np.full((n, n), -1, dtype=np.int32)
+        ids = np.arange(len(edges), dtype=np.int32)
+        self.edge_id[self.edge_u, self.edge_v] = ids
+        if not self.directed:
+            self.edge_id[self.edge_v, self.edge_u] = ids
+
+        self._routes = self._shortest_routes(G)
+
+    @classmethod
+    def from_gml(cls, path):
+        return cls(nx.read_gml(path))
+
+    @property
+    def n_nodes(self):
+        return len(self.labels)
+
+    @property
+    def n_edges(self):
+        return len(self.length_km)
+
+    @property
+    def n_arcs(self):
+        return 2 * len(self.length_km)
+
+    def arc(self, edge, node):
+        '''
+        Returns the id of the arc that leaves 'node' over 'edge': 2 * edge in
+        the direction edge_u -> edge_v, 2 * edge + 1 in the other direction.
+        '''
+        return 2 * edge + (self.edge_u[edge] != node)
+
+    def node_by_name(self, name):
+        '''
+        Returns the index of the node with the given 'name' attribute.
+        '''
+        try:
+            return self.names.index(name)
+        except ValueError:
+            raise KeyError(f"Could not find junction name '{name}' in the network") from None
+
+    def _shortest_routes(self, G):
+        '''
+        Shortest route (by length) between all pairs of nodes as edge-id arrays,
+        in an n x n nested list (None if there is no route).
+        '''
+        n = self.n_nodes
+        routes = [[None] * n for _ in range(n)]
+        for origin, paths in nx.all_pairs_dijkstra_path(G, weight='length'):
+            i = self.index[origin]
+            for dest, nodes in paths.items():
+                idx = [self.index[node] for node in nodes]
+                routes[i][self.index[dest]] = self.edge_id[idx[:-1], idx[1:]]
+        return routes
+
+    def route(self, i, j):
+        '''
+        Returns the edge ids of the shortest route from node i to node j
+        (node indices). Raises KeyError if j cannot be reached from i.
+        '''
+        edges = self._routes[i][j]
+        if edges is None:
+            raise KeyError(f'No route from {self.labels[i]} to {self.labels[j]}')
+        return edges
+
+    def route_nodes(self, i, j):
+        '''
+        Returns the node indices visited by the shortest route from i to j.
+        '''
+        edges = self.route(i, j)
+        nodes = [i]
+        for e in edges:
+            u, v = self.edge_u[e], self.edge_v[e]
+            nodes.append(int(v if u == nodes[-1] else u))
+        return nodes
+
+    def route_length_km(self, i, j):
+        return float(self.length_km[self.route(i, j)].sum())
+
+
+class IncidentRouter :
+
+    '''
+    Constructor for this IncidentRouter class.
+
+    Args:
+            network (CompiledNetwork): the road network.
+            penalty_km (float): added to the length of a blocked edge, i.e.
+            the detour (in km) a driver accepts to avoid an incident.
+
+    Gives the next edge on the shortest route from a node to a destination
+    when the arcs (directed edges, see CompiledNetwork.arc) in a given
+    blocked set are inflated by penalty_km, so an incident only diverts the
+    traffic in its own direction. All
+    next hops for one blocked set come from a single all-pairs Dijkstra and
+    are memoized by frozenset(blocked); a small network only ever sees a few
+    distinct blocked sets, so re-planning at every junction is a table lookup.
+    '''
+
+    def __init__(self, network, penalty_km):
+        self.network = network
+        self.penalty_km = penalty_km
+        self._next_edge = {}  # frozenset of blocked arc ids -> n x n nested list
+
+    def next_edge(self, i, j, blocked=frozenset()):
+        '''
+        Returns the id of the first edge on the shortest route from node i to
+        node j given the blocked arc ids. Raises KeyError if j cannot be
+        reached from i (or i == j).
+        '''
+        key = blocked if isinstance(blocked, frozenset) else frozenset(blocked)
+        table = self._next_edge.get(key)
+        if table is None:
+            table = self._next_edge[key] = self._next_edges(key)
+        edge = table[i][j]
+        if edge < 0:
+            raise KeyError(f'No route from {self.network.labels[i]} to {self.network.labels[j]}')
+        return edge
+
+    def _next_edges(self, blocked):
+        net = self.network
+        n = net.n_nodes
+        # arc weights, row 0: edge_u -> edge_v, row 1: edge_v -> edge_u
+        weights = np.vstack((net.length_km, net.length_km))
+        if blocked:
+            arcs = np.fromiter(blocked, dtype=np.int64)
+            weights[arcs % 2, arcs // 2] += self.penalty_km
+        u, v = net.edge_u, net.edge_v
+        if net.directed:
+            W = csr_matrix((weights[0], (u, v)), shape=(n, n))
+        else:
+            W = csr_matrix((weights.ravel(), (np.r_[u, v], np.r_[v, u])), shape=(n, n))
+        # Dijkstra from every j on the reversed graph: the predecessor of i is
+        # the node after i on the shortest route i -> j
+        _, pred = dijkstra(W.T, directed=True, return_predecessors=True)
+        nxt = pred.T
+        rows = np.repeat(np.arange(n), n).reshape(n, n)
+        edges = np.where(nxt >= 0, net.edge_id[rows, np.maximum(nxt, 0)], -1)
+        return edges.tolist()
@@ -0,0 +1,276 @@
+'''
+Fast loading of large GML road networks such as networkNLcomplete.gml.
+
+nx.read_gml is pure Python, and turning every 'LINESTRING (x y, x y, ...)'
+geometry string into a shapely LineString on top of that makes loading the
+complete Dutch network take minutes. load_network() parses the GML only
+once and writes a binary cache next to it (a directory '<file>.cache'):
+
+    meta.json               labels, string attributes, attribute kinds and
+                            the size/mtime of the GML file it was built from
+    edge_u.npy, edge_v.npy  end points of every edge (node indices)
+    node_<k>.npy            numeric node attribute k (e.g. x, y)
+    edge_<k>.npy            numeric edge attribute k (e.g. length, lanes)
+    edge_geom_<k>_coords.npy   all points of geometry edge attribute k,
+                               packed (m x 2)
+    edge_geom_<k>_offsets.npy  edge e owns coords[offsets[e]:offsets[e + 1]]
+    node_geom_<k>_*.npy        the same for geometry node attributes
+
+Later loads memory-map the .npy files, so only the pages that are used are
+read. Geometries stay packed coordinate arrays; shapely objects are only
+made on request (GMLNetwork.geometry), e.g. when plotting.
+'''
+
+import json
+import os
+
+import networkx as nx
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+
+CACHE_VERSION = 2
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return {'version': CACHE_VERSION, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _is_linestring(value):
+    return isinstance(value, str) and value.startswith('LINESTRING')
+
+
+def _pack_linestrings(values):
+    '''
+    Packs 'LINESTRING (x y, x y, ...)' strings (None for missing, no points
+    for 'LINESTRING EMPTY') into one (m x 2) coordinate array plus offsets,
+    with a single float conversion.
+    '''
+    bodies = [v[v.index('(') + 1:v.rindex(')')] if v and '(' in v else '' for v in values]
+    counts = np.array([b.count(',') + 1 if b.strip() else 0 for b in bodies], dtype=np.int64)
+    offsets = np.zeros(len(bodies) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    text = ' '.join(b for b in bodies if b.strip()).replace(',', ' ')
+    coords = np.array(text.split(), dtype=float).reshape(-1, 2)
+    return coords, offsets
+
+
+def _split_attributes(records, prefix, arrays, meta):
+    '''
+    Sorts the attributes of the node or edge dicts in 'records' into numeric
+    arrays (missing values NaN), string lists and packed geometries.
+    '''
+    keys = sorted({k for r in records for k in r})
+    for k, key in enumerate(keys):
+        values = [r.get(key) for r in records]
+        present = [v for v in values if v is not None]
+        if present and all(_is_linestring(v) for v in present):
+            coords, offsets = _pack_linestrings(values)
+            arrays[f'{prefix}_geom_{k}_coords'], arrays[f'{prefix}_geom_{k}_offsets'] = coords, offsets
+            kind = 'geometry'
+        elif present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+            kind = 'int' if all(isinstance(v, int) for v in present) else 'float'
+            if kind == 'int' and len(present) == len(values):
+                arrays[f'{prefix}_{k}'] = np.array(values, dtype=np.int64)
+            else:
+                arrays[f'{prefix}_{k}'] = np.array([np.nan if v is None else v for v in values], dtype=float)
+        else:
+            kind = 'str'
+            meta[f'{prefix}_{k}'] = [None if v is None else str(v) for v in values]
+        meta[f'{prefix}_attributes'].append([key, kind])
+
+
+def build_cache(path, cache_dir=None):
+    '''
+    Parses the GML file with networkx (geometries are kept as strings) and
+    writes the binary cache. Returns the cache directory.
+    '''
+    cache_dir = cache_dir or path + '.cache'
+    G = nx.read_gml(path)
+    labels = list(G.nodes)
+    index = {label: i for i, label in enumerate(labels)}
+    edges = list(G.edges(data=True))
+
+    meta = {'source': _source_stamp(path), 'directed': G.is_directed(),
+            'multigraph': G.is_multigraph(), 'graph': dict(G.graph),
+            'labels': labels, 'node_attributes': [], 'edge_attributes': []}
+    arrays = {'edge_u': np.array([index[u] for u, _, _ in edges], dtype=np.int64),
+              'edge_v': np.array([index[v] for _, v, _ in edges], dtype=np.int64)}
+    _split_attributes([G.nodes[label] for label in labels], 'node', arrays, meta)
+    _split_attributes([d for _, _, d in edges], 'edge', arrays, meta)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    for name, values in arrays.items():
+        np.save(os.path.join(cache_dir, name + '.npy'), values)
+    # meta.json last: a cache without it (e.g. interrupted write) is rebuilt
+    with open(os.path.join(cache_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    return cache_dir
+
+
+def load_network(path, cache_dir=None, rebuild=False):
+    '''
+    Returns the network in the GML file 'path' as a GMLNetwork, from the
+    binary cache if it is up to date and otherwise after (re)building it.
+    '''
+    cache_dir = cache_dir or path + '.cache'
+    meta_file = os.path.join(cache_dir, 'meta.json')
+    meta = None
+    if not rebuild and os.path.exists(meta_file):
+        with open(meta_file, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('source') != _source_stamp(path):
+            meta = None
+    if meta is None:
+        build_cache(path, cache_dir)
+        with open(meta_file, encoding='utf-8') as f:
+            meta = json.load(f)
+    return GMLNetwork(cache_dir, meta)
+
+
+class GMLNetwork :
+
+    '''
+    Constructor for this GMLNetwork class; use load_network() to create one.
+
+    Attributes:
+            labels (list): node label of every node index
+            index (dict): node index of every node label
+            edge_u, edge_v (numpy int arrays): end points of every edge
+            node_attr (dict): node attribute name -> array or list per node
+            edge_attr (dict): edge attribute name -> array or list per edge
+            geometry_attributes (list): edge attributes stored as geometry
+            node_geometry_attributes (list): node attributes stored as geometry
+    '''
+
+    def __init__(self, cache_dir, meta):
+        def load(name):
+            return np.load(os.path.join(cache_dir, name + '.npy'), mmap_mode='r')
+
+        self.directed = meta['directed']
+        self.multigraph = meta['multigraph']
+        self.graph_attr = meta['graph']
+        self.labels = meta['labels']
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.edge_u = load('edge_u')
+        self.edge_v = load('edge_v')
+        self._kinds = {}
+        self._geometry = {}  # (prefix, name) -> (coords, offsets)
+        self.node_attr = {}
+        self.edge_attr = {}
+        for prefix, attrs in (('node', self.node_attr), ('edge', self.edge_attr)):
+            for k, (key, kind) in enumerate(meta[f'{prefix}_attributes']):
+                self._kinds[prefix, key] = kind
+                if kind == 'geometry':
+                    self._geometry[prefix, key] = (load(f'{prefix}_geom_{k}_coords'),
+                                                   load(f'{prefix}_geom_{k}_offsets'))
+                elif kind == 'str':
+                    attrs[key] = meta[f'{prefix}_{k}']
+                else:
+                    attrs[key] = load(f'{prefix}_{k}')
+        self.geometry_attributes = [key for prefix, key in self._geometry if prefix == 'edge']
+        self.node_geometry_attributes = [key for prefix, key in self._geometry if prefix == 'node']
+
+    @property
+    def n_nodes(self):
+        return len(self.labels)
+
+    @property
+    def n_edges(self):
+        return len(self.edge_u)
+
+    def positions(self):
+        '''
+        Returns {label: (x, y)}, e.g. for nx.draw(pos=...).
+        '''
+        return dict(zip(self.labels, zip(self.node_attr['x'].tolist(), self.node_attr['y'].tolist())))
+
+    def coords(self, e, attribute='geometry', prefix='edge'):
+        '''
+        Returns the (k x 2) coordinates of the geometry of edge e (or node e
+        with prefix='node'), a view on the memory-mapped buffer.
+        '''
+        coords, offsets = self._geometry[prefix, attribute]
+        return coords[offsets[e]:offsets[e + 1]]
+
+    def geometry(self, e, attribute='geometry', prefix='edge'):
+        '''
+        Returns the geometry of edge e (or node e with prefix='node') as a
+        shapely LineString (None if it has no or an empty geometry).
+        Requires shapely.
+        '''
+        from shapely.geometry import LineString
+
+        points = self.coords(e, attribute, prefix)
+        return LineString(np.asarray(points)) if len(points) else None
+
+    def segments(self, attribute='geometry', prefix='edge'):
+        '''
+        Returns the coordinates of every edge (or node) geometry, e.g. for a
+        matplotlib LineCollection, without creating shapely objects.
+        '''
+        coords, offsets = self._geometry[prefix, attribute]
+        return np.split(np.asarray(coords), np.asarray(offsets[1:-1]))
+
+    def shortest_path(self, source, target, weight='length'):
+        '''
+        Returns the node labels on the shortest route from node 'source' to
+        node 'target' (labels) by edge attribute 'weight', with scipy's
+        Dijkstra on the cached arrays, so no networkx graph is built. Raises
+        KeyError if target cannot be reached from source.
+        '''
+        u, v = np.asarray(self.edge_u), np.asarray(self.edge_v)
+        w = np.asarray(self.edge_attr[weight], dtype=float)
+        # parallel edges: keep the shortest (csr_matrix would add them up)
+        order = np.lexsort((w, v, u))
+        u, v, w = u[order], v[order], w[order]
+        first = np.r_[True, (u[1:] != u[:-1]) | (v[1:] != v[:-1])]
+        W = csr_matrix((w[first], (u[first], v[first])), shape=(self.n_nodes, self.n_nodes))
+        i, j = self.index[source], self.index[target]
+        _, pred = dijkstra(W, directed=self.directed, indices=i, return_predecessors=True)
+        if i != j and pred[j] < 0:
+            raise KeyError(f'No route from {source} to {target}')
+        nodes = [j]
+        while nodes[-1] != i:
+            nodes.append(int(pred[nodes[-1]]))
+        return [self.labels[k] for k in reversed(nodes)]
+
+    def _values(self, attrs, prefix, n):
+        columns = []
+        for key, values in attrs.items():
+            kind = self._kinds[prefix, key]
+            values = values.tolist() if isinstance(values, np.ndarray) else values
+            if kind == 'int':
+                values = [None if v != v else int(v) for v in values]
+            elif kind == 'float':
+                values = [None if v != v else v for v in values]
+            columns.append((key, values))
+        return [{key: values[i] for key, values in columns if values[i] is not None}
+                for i in range(n)]
+
+    def to_networkx(self, geometry=False):
+        '''
+        Builds the networkx graph. Geometry attributes are left out unless
+        'geometry' is True, in which case they become shapely LineStrings.
+        '''
+        if self.multigraph:
+            G = nx.MultiDiGraph() if self.directed else nx.MultiGraph()
+        else:
+            G = nx.DiGraph() if self.directed else nx.Graph()
+        G.graph.update(self.graph_attr)
+        node_data = self._values(self.node_attr, 'node', self.n_nodes)
+        edge_data = self._values(self.edge_attr, 'edge', self.n_edges)
+        if geometry:
+            for prefix, key in self._geometry:
+                data = node_data if prefix == 'node' else edge_data
+                for e, d in enumerate(data):
+                    line = self.geometry(e, key, prefix)
+                    if line is not None:
+                        d[key] = line
+        G.add_nodes_from(zip(self.labels, node_data))
+        labels = self.labels
+        G.add_edges_from((labels[u], labels[v], d) for u, v, d in
+                         zip(self.edge_u.tolist(), self.edge_v.tolist(), edge_data))
+        return G
@@ -4,36 +4,24 @@ import scipy.stats as stats
 import numpy as np
 from scipy.stats import kstest
 
-# Read CSV file with semicolon as delimiter
-df = pd.read_csv('C:\\Users\\20223101\\OneDrive - TU Eindhoven\\Desktop\\Stochastic-Simulation-3\\2024-11_rws_filedata.csv', delimiter=";", decimal=",")
+from Bootstrap import bootstrap_candidates, print_bootstrap
+from DistributionFitting import fit_candidates, print_fits, save_best
+from IncidentRates import HourlyRateEstimator
+from RWSData import incidents_per_day as count_incidents_per_day, load_rws
 
-df['DatumFileBegin'] = pd.to_datetime(df['DatumFileBegin'], format='%Y-%m-%d').dt.date
-df['DatumFileEind'] = pd.to_datetime(df['DatumFileEind'], format='%Y-%m-%d').dt.date
-df['TijdFileBegin'] = pd.to_datetime(df['TijdFileBegin'], format='%H:%M:%S').dt.time
-df['TijdFileEind'] = pd.to_datetime(df['TijdFileEind'], format='%H:%M:%S').dt.time
-df['TotalSeconds_TFB'] = df['TijdFileBegin'].apply(lambda t: t.hour * 3600 + t.minute * 60 + t.second)
+# True: overwrite the tracked incident_duration.json (the duration distribution
+# Question 3 samples from) with the best fit below
+SAVE_DURATION_FIT = False
 
-# Ensure the DataFrame is sorted by DatumFileBegin and TijdFileBegin
-df = df.sort_values(by=['DatumFileBegin', 'TijdFileBegin'])
+RWS_FILES = ['C:\\Users\\20223101\\OneDrive - TU Eindhoven\\Desktop\\Stochastic-Simulation-3\\2024-11_rws_filedata.csv']
 
-# Combine DatumFileBegin and TijdFileBegin into a single datetime column for accurate time calculations
-df['DatetimeFileBegin'] = pd.to_datetime(df['DatumFileBegin'].astype(str) + ' ' + df['TijdFileBegin'].astype(str))
+# Read the CSV file(s) (semicolon delimiter, decimal comma) with all time
+# features: DatetimeFileBegin/-Eind, Hour, Hour_End, FileDuurInSeconds,
+# TimeElapsed (reset for the first incident of each day), ... (see RWSData.py).
+# The cleaned frame is cached, so later runs skip the parsing.
+df = load_rws(RWS_FILES)
 
-df['FileDuurInSeconds'] = df['FileDuur'] * 60
-
-# Calculate the time difference between successive incidents
-df['TimeElapsed'] = df['DatetimeFileBegin'].diff().dt.total_seconds()
-
-# Reset the time difference to NaN for the first incident of each day
-df.loc[df['DatumFileBegin'] != df['DatumFileBegin'].shift(), 'TimeElapsed'] = None
-
-
-incidents_per_day = df.groupby('DatumFileBegin').size().reset_index(name='incidents_per_day')
-incidents_per_day['day_of_week'] = pd.to_datetime(incidents_per_day['DatumFileBegin']).dt.day_name()
-incidents_per_day = incidents_per_day[['DatumFileBegin', 'day_of_week', 'incidents_per_day']] # Reorder columns
-
-# Create custom labels for x-axis
-incidents_per_day['custom_label'] = incidents_per_day['DatumFileBegin'].apply(lambda x: str(x.day) + "\n" + incidents_per_day.loc[incidents_per_day['DatumFileBegin'] == x, 'day_of_week'].values[0][0])
+incidents_per_day = count_incidents_per_day(df)
 
 # Plot incidents_per_day
 plt.figure(figsize=(12, 6))
@@ -45,14 +33,6 @@ plt.xticks(rotation=0, ha='center')  # Keep labels horizontal and centered
 plt.tight_layout()
 plt.show()
 
-# Convert TijdFileBegin to datetime and extract the hour
-df['TijdFileBegin'] = pd.to_datetime(df['TijdFileBegin'], format='%H:%M:%S')  # Keep as datetime
-df['Hour'] = df['TijdFileBegin'].dt.hour  # Extract hour
-
-# Convert TijdFileEind to datetime and extract the hour
-df['TijdFileEind'] = pd.to_datetime(df['TijdFileEind'], format='%H:%M:%S')  # Keep as datetime
-df['Hour_End'] = df['TijdFileEind'].dt.hour  # Extract hour
-
 # Group by DatumFileBegin and Hour to calculate incidents per hour for TijdFileBegin
 incidents_per_hour_begin = df.groupby(['DatumFileBegin', 'Hour']).size().reset_index(name='incidents_per_hour_begin')
 
@@ -93,6 +73,10 @@ incident_rate_per_hour['incident_rate'] = incident_rate_per_hour['total_incident
 
 print(incident_rate_per_hour)
 
+# Write the hourly (and weekday x hour) rate table that Question 3 loads; it is
+# built from the local RWS files and not tracked by git
+HourlyRateEstimator().add_files(RWS_FILES).write('incident_rates.json')
+
 # Ensure FileDuur is numeric and drop NaN values
 df['FileDuur'] = pd.to_numeric(df['FileDuur'], errors='coerce')  # Convert to numeric if not already
 file_duur_data = df['FileDuur'].dropna()
@@ -144,7 +128,7 @@ params_gamma = stats.gamma.fit(file_duur_data)
 shape, loc, scale = params_gamma
 
 # Generate x values for the fitted distribution
-pdf_gamma = stats.gamma.pdf(x, 1.19, loc, 6.09)
+pdf_gamma = stats.gamma.pdf(x, shape, loc, scale)
 
 # Plot the histogram and fitted gamma distribution
 plt.figure(figsize=(10, 6))
@@ -185,4 +169,22 @@ plt.show()
 # Perform the Kolmogorov-Smirnov test for log-normal
 ks_statistic_lognorm, p_value_lognorm = kstest(file_duur_data, 'lognorm', args=(shape, loc, scale))
 print(f"Log-Normal KS Test Statistic: {ks_statistic_lognorm:.4f}")
-print(f"Log-Normal P-Value: {p_value_lognorm:.4f}")
\ No newline at end of file
+print(f"Log-Normal P-Value: {p_value_lognorm:.4f}")
+
+# Fit all candidate distributions (MLE from method-of-moments starting
+# values) and compare them on AIC and the KS/AD statistics. This script has no
+# __main__ guard, which worker processes need on Windows, so fit in this
+# process; fit_groups(..., n_workers=None) fits per hour or segment in parallel.
+duration_fits = fit_candidates(file_duur_data, n_workers=1)
+print_fits(duration_fits)
+
+# Save the best fit; Question 3 samples incident durations from it
+print(f"Best fit (lowest AIC): {duration_fits[0].name}")
+if SAVE_DURATION_FIT:
+    best_duration = save_best(duration_fits, 'incident_duration.json')
+    print("Saved to incident_duration.json")
+
+# The KS p-values above use parameters estimated from the same data and are
+# too optimistic; the parametric bootstrap (1000 refitted synthetic data sets
+# per model) gives valid p-values
+print_bootstrap(bootstrap_candidates(file_duur_data, n_boot=1000, seed=2024))
@@ -24,16 +24,24 @@ of Rotterdam→Eindhoven car travel times.
 
 """
 
-import heapq
 import math
-import random
-import statistics
-from collections import defaultdict
-from typing import Dict, List, Tuple
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Tuple
 
 import matplotlib.pyplot as plt
 import networkx as nx
 import numpy as np
+from scipy.stats import norm, uniform
+
+from Arrivals import ArrivalProcess
+from Demand import ODSampler
+from Distribution import Distribution, RandomStreams
+from EventSet import HeapEventSet
+from Network import CompiledNetwork
+from RunningStats import RunningStats
+from VarianceReduction import UniformGenerator, estimate
 
 
 HOURLY_RATES = [
@@ -42,6 +50,9 @@ HOURLY_RATES = [
     4945.4, 4525.8, 2847.8, 1828.0, 1378.4, 1271.2, 1171.2, 767.6,
 ]
 
+SMOOTH_ARRIVALS = False   # True: piecewise-linear rate profile (see ArrivalProcess.hourly)
+ARRIVAL_PROCESS = ArrivalProcess.hourly(HOURLY_RATES, SMOOTH_ARRIVALS)
+
 CAR_FRACTION = 0.9       # probability a vehicle is a car
 CAR_VMAX_KMH = 100.0     # maximum speed car  (km/h)
 TRUCK_VMAX_KMH= 80.0      # maximum speed truck (km/h)
@@ -51,117 +62,533 @@ SIM_DURATION_MIN= 24 * 60   # 24 h expressed in minutes
 # Monte‑Carlo settings
 N_RUNS = 30 
 RANDOM_SEED = 42 
-
-
-def sample_link_travel_time(length_km: float, vmax_kmh: float) -> float:
-    """Return a single normal sample for travel time (minutes) on one link."""
+VECTORIZED = False   # True: array-based engine instead of the event heap
+N_WORKERS = 1        # worker processes for the replications (0 or None: all cores)
+ANTITHETIC = False   # antithetic pairs of replications (array engine only)
+CONTROL_VARIATES = False  # correct Table 1 with the number of arrivals and route length
+
+# Sequential stopping rule: instead of N_RUNS, keep adding replications until the
+# 95 % CI half-width of every measure in TARGET_MEASURES is at most
+# TARGET_REL_HALF_WIDTH × |mean|, or until MAX_RUNS / MAX_SECONDS is reached.
+SEQUENTIAL = False
+TARGET_REL_HALF_WIDTH = 0.001
+TARGET_MEASURES = None    # keys of TABLE1_MEASURES; None = all rows
+MIN_RUNS = 10
+BATCH_RUNS = 10
+MAX_RUNS = 2000
+MAX_SECONDS = 600.0
+
+
+def sample_link_travel_time(length_km: float, vmax_kmh: float,
+                            std_normal: Distribution) -> float:
+    """
+    Return a single normal sample for travel time (minutes) on one link, drawn
+    from `std_normal` (a standard normal Distribution on the run's own stream).
+    """
     mu = length_km / vmax_kmh * 60.0                # convert h → min
     sigma = mu * STD_COEFF
-    tt = random.gauss(mu, sigma)
+    tt = mu + sigma * std_normal.rvs()
     return max(0.01, tt)    # truncate at tiny positive value
 
-def poisson(lmbda: float) -> int:
-    """Draw from Poisson(λ) using numpy for convenience."""
-    return int(np.random.poisson(lmbda))
+# Precomputed shortest routes
+
+class Route(NamedTuple):
+    """Shortest route (by distance) between one origin and destination."""
+    nodes: List[str]
+    edges: np.ndarray       # edge ids in the CompiledNetwork
+    link_km: np.ndarray     # length of every link on the route (km)
+    length_km: float
+
+
+class RouteTable:
+    """
+    All‑pairs table of shortest routes on a graph.
+
+    The network is small (16 junctions, 240 OD pairs), so every route is
+    computed once with Dijkstra and looked up afterwards.  The table is tied to
+    the graph it was built from: call `invalidate()` after changing the graph
+    (edges, lengths) and the network and routes are recompiled on the next
+    lookup.
+    """
+
+    def __init__(self, G: nx.Graph):
+        self.G = G
+        self._routes: Dict[Tuple[str, str], Route] = {}
+        self.build()
+
+    def build(self) -> None:
+        self.network = CompiledNetwork(self.G)
+        self.nodes: List[str] = self.network.labels
+        self._routes = {}
+        n = self.network.n_nodes
+        for i in range(n):
+            for j in range(n):
+                if i == j:
+                    continue
+                edges = self.network.route(i, j)
+                link_km = self.network.length_km[edges]
+                nodes = [self.nodes[k] for k in self.network.route_nodes(i, j)]
+                self._routes[(self.nodes[i], self.nodes[j])] = Route(
+                    nodes, edges, link_km, float(link_km.sum()))
+
+    def invalidate(self) -> None:
+        """Drop all routes; they are rebuilt from the graph on the next lookup."""
+        self._routes = {}
+
+    def __getitem__(self, od: Tuple[str, str]) -> Route:
+        if not self._routes:
+            self.build()
+        return self._routes[od]
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def by_index(self, origin_idx: int, dest_idx: int) -> Route:
+        """Route between `nodes[origin_idx]` and `nodes[dest_idx]`."""
+        if not self._routes:
+            self.build()
+        return self._routes[(self.nodes[origin_idx], self.nodes[dest_idx])]
+
+    def length_matrix(self) -> np.ndarray:
+        """Route lengths (km) indexed by origin and destination index (0 on the diagonal)."""
+        n = len(self.nodes)
+        return np.array([[self.by_index(i, j).length_km if i != j else 0.0
+                          for j in range(n)] for i in range(n)])
+
+
+def sample_route_travel_times(link_km: np.ndarray, vmax_kmh: float, n: int,
+                              rng=None) -> np.ndarray:
+    """
+    Return `n` route travel times (minutes) for vehicles with the same route and
+    maximum speed.  All link times are drawn as one (n × links) normal matrix,
+    truncated like `sample_link_travel_time` and summed per vehicle.
+    """
+    rng = np.random if rng is None else rng
+    mu = link_km / vmax_kmh * 60.0
+    tt = rng.normal(mu, mu * STD_COEFF, size=(n, len(mu)))
+    return np.maximum(tt, 0.01).sum(axis=1)
+
+def sample_travel_times_batch(routes: RouteTable,
+                              origins: np.ndarray,
+                              dests: np.ndarray,
+                              is_car: np.ndarray,
+                              rng=None) -> np.ndarray:
+    """
+    Return the route travel time (minutes) of every vehicle in a batch.
+
+    `origins` and `dests` are indices into `routes.nodes`.  Vehicles are grouped
+    by route and vehicle class and each group is sampled with one call to
+    `sample_route_travel_times`.
+    """
+    n_nodes = len(routes.nodes)
+    key = (origins * n_nodes + dests) * 2 + is_car.astype(np.int64)
+    order = np.argsort(key, kind='stable')
+    sorted_key = key[order]
+    starts = np.flatnonzero(np.r_[True, sorted_key[1:] != sorted_key[:-1]])
+    ends = np.r_[starts[1:], len(sorted_key)]
+
+    tt = np.empty(len(key))
+    for start, end in zip(starts, ends):
+        k = int(sorted_key[start])
+        car = k % 2
+        origin_idx, dest_idx = divmod(k // 2, n_nodes)
+        vmax = CAR_VMAX_KMH if car else TRUCK_VMAX_KMH
+        link_km = routes.by_index(origin_idx, dest_idx).link_km
+        tt[order[start:end]] = sample_route_travel_times(link_km, vmax, end - start, rng)
+    return tt
 
-def t_conf_interval(data: List[float], alpha=0.05) -> Tuple[float, float]:
-    """Return the half‑width of the (1‑alpha) confidence interval for the mean."""
-    if len(data) < 2:
-        return math.nan, math.nan
-    mean = statistics.mean(data)
-    sd   = statistics.stdev(data, xbar=mean)
-    half_width = 1.96 * sd / math.sqrt(len(data))
-    return mean - half_width, mean + half_width
 
 # Simulation of one 24‑hour period
 
+def rot_ehv_hist_bins(routes: RouteTable, rotterdam_id: int, eindhoven_id: int,
+                      n_bins: int = 40, n_sd: float = 6.0) -> np.ndarray:
+    """
+    Histogram bin edges for Rotterdam→Eindhoven car travel times: μ ± `n_sd` σ
+    of the route travel time (sum of independent normal link times).  The few
+    observations outside are counted in the under- and overflow of RunningStats.
+    """
+    mu_links = routes[(rotterdam_id, eindhoven_id)].link_km / CAR_VMAX_KMH * 60.0
+    mu = mu_links.sum()
+    sd = STD_COEFF * math.sqrt(float((mu_links ** 2).sum()))
+    return np.linspace(mu - n_sd * sd, mu + n_sd * sd, n_bins + 1)
+
+def _day_accumulators(routes: RouteTable, rotterdam_id: int,
+                      eindhoven_id: int) -> Dict[str, RunningStats]:
+    return {
+        'tt_all'         : RunningStats(),
+        'tt_car'         : RunningStats(),
+        'tt_truck'       : RunningStats(),
+        'len_km'         : RunningStats(),
+        'arr_len_km'     : RunningStats(),   # route length of every arrival
+        'rot_ehv_car_tt' : RunningStats(rot_ehv_hist_bins(routes, rotterdam_id,
+                                                          eindhoven_id)),
+    }
+
+def _day_stats(acc: Dict[str, RunningStats]) -> Dict[str, float]:
+    """Summary of one replication from its accumulators."""
+    stats = {
+        'total_vehicles'          : acc['tt_all'].n,
+        'mean_tt_all'             : acc['tt_all'].mean,
+        'mean_tt_car'             : acc['tt_car'].mean,
+        'mean_tt_truck'           : acc['tt_truck'].mean,
+        'mean_len_km'             : acc['len_km'].mean,
+        'n_arrivals'              : acc['arr_len_km'].n,
+        'mean_arr_len_km'         : acc['arr_len_km'].mean,
+        'rot_ehv_car_tt'          : acc['rot_ehv_car_tt'],
+        'mean_rot_ehv_car_tt'     : acc['rot_ehv_car_tt'].mean,
+        'std_tt_all'              : acc['tt_all'].std,
+        'std_tt_car'              : acc['tt_car'].std,
+        'std_tt_truck'            : acc['tt_truck'].std,
+        'std_len_km'              : acc['len_km'].std,
+    }
+    return stats
+
+
 def simulate_one_day(G: nx.Graph,
                      node_ids: List[int],
                      rotterdam_id: int,
                      eindhoven_id: int,
-                     run_seed: int = 0) -> Dict[str, float]:
+                     run_seed: int = 0,
+                     routes: RouteTable = None,
+                     event_set=HeapEventSet,
+                     arrival_process: ArrivalProcess = None) -> Dict[str, float]:
     """
     Run one replication of the *no‑incidents* model and return performance stats.
-    Times are recorded in minutes, distances in km.
+    Times are recorded in minutes, distances in km.  Pass a prebuilt `routes`
+    table to share the shortest routes between replications.  `run_seed` is an
+    int or a `numpy.random.SeedSequence`; arrivals, vehicle classes, routing and
+    link travel times each get their own stream (see `RandomStreams`).
+    `event_set` is the future event set class (see EventSet.py).  Arrivals are
+    drawn an hour at a time from `arrival_process` (default ARRIVAL_PROCESS)
+    and read lazily, so the FES holds only the next arrival.
     """
-    random.seed(run_seed)
-    np.random.seed(run_seed)
+    if routes is None:
+        routes = RouteTable(G)
+    if arrival_process is None:
+        arrival_process = ARRIVAL_PROCESS
+    streams = RandomStreams(run_seed)
+    arrivals = arrival_process.times(streams.generator('arrivals'))
+    vehicle_class = streams.distribution('vehicle_class', uniform())
+    routing = streams.distribution('routing', uniform())
+    link_time = streams.distribution('link_time', norm())
+    n_nodes = len(node_ids)
 
 
-    fes: List[Tuple[float, str, tuple]] = []
+    fes = event_set()   # events: (time, type, data)
 
-    for hour, rate in enumerate(HOURLY_RATES):
-        n_arr = poisson(rate)
-        for _ in range(n_arr):
-            t_arr = hour * 60.0 + random.uniform(0.0, 60.0)   
-            heapq.heappush(fes, (t_arr, 'ARRIVAL', None))
+    t_arr = next(arrivals, None)
+    if t_arr is not None:
+        fes.push((t_arr, 'ARRIVAL', None))
 
 
-    total_vehicles = 0
-    travel_times_all:  List[float] = []
-    travel_times_cars: List[float] = []
-    travel_times_trucks: List[float] = []
-    trip_lengths_km:   List[float] = []
-    rot_ehv_car_times: List[float] = []
+    acc = _day_accumulators(routes, rotterdam_id, eindhoven_id)
 
   
     while fes:
-        time_min, ev_type, _ = heapq.heappop(fes)
+        time_min, ev_type, _ = fes.pop()
         if time_min > SIM_DURATION_MIN:
             break
 
         if ev_type == 'ARRIVAL':
+            t_arr = next(arrivals, None)
+            if t_arr is not None:
+                fes.push((t_arr, 'ARRIVAL', None))
 
-            is_car  = (random.random() < CAR_FRACTION)
+            is_car  = (vehicle_class.rvs() < CAR_FRACTION)
             vmax    = CAR_VMAX_KMH if is_car else TRUCK_VMAX_KMH
 
-            origin, dest = random.sample(node_ids, 2)
+            # uniform over ordered pairs of distinct junctions
+            i = int(routing.rvs() * n_nodes)
+            j = (i + 1 + int(routing.rvs() * (n_nodes - 1))) % n_nodes
+            origin, dest = node_ids[i], node_ids[j]
 
-            route_nodes = nx.shortest_path(G, origin, dest, weight='length')
-            route_len_m = nx.shortest_path_length(G, origin, dest, weight='length')
-            route_len_km = route_len_m / 1_000.0
+            route = routes[(origin, dest)]
+            route_len_km = route.length_km
+            acc['arr_len_km'].add(route_len_km)
 
             route_tt_min = 0.0
-            for u, v in zip(route_nodes[:-1], route_nodes[1:]):
-                length_km = G.edges[(u, v)]['length'] / 1_000.0
-                route_tt_min += sample_link_travel_time(length_km, vmax)
+            for length_km in route.link_km:
+                route_tt_min += sample_link_travel_time(length_km, vmax, link_time)
 
             dep_time = time_min + route_tt_min
-            heapq.heappush(fes, (dep_time, 'DEPARTURE',
-                                 (is_car, route_tt_min, route_len_km,
-                                  origin, dest)))
+            fes.push((dep_time, 'DEPARTURE',
+                      (is_car, route_tt_min, route_len_km, origin, dest)))
 
         elif ev_type == 'DEPARTURE':
             is_car, tt_min, len_km, origin, dest = _
-            total_vehicles += 1
-            travel_times_all.append(tt_min)
-            trip_lengths_km.append(len_km)
+            acc['tt_all'].add(tt_min)
+            acc['len_km'].add(len_km)
             if is_car:
-                travel_times_cars.append(tt_min)
+                acc['tt_car'].add(tt_min)
                 if origin == rotterdam_id and dest == eindhoven_id:
-                    rot_ehv_car_times.append(tt_min)
+                    acc['rot_ehv_car_tt'].add(tt_min)
             else:
-                travel_times_trucks.append(tt_min)
+                acc['tt_truck'].add(tt_min)
+
+    return _day_stats(acc)
+
+def simulate_one_day_array(G: nx.Graph,
+                           node_ids: List[int],
+                           rotterdam_id: int,
+                           eindhoven_id: int,
+                           run_seed: int = 0,
+                           routes: RouteTable = None,
+                           antithetic: bool = None,
+                           arrival_process: ArrivalProcess = None) -> Dict[str, float]:
+    """
+    Array-based version of `simulate_one_day` with the same model and output.
 
-    stats = {
-        'total_vehicles'          : total_vehicles,
-        'mean_tt_all'             : statistics.mean(travel_times_all),
-        'mean_tt_car'             : statistics.mean(travel_times_cars),
-        'mean_tt_truck'           : statistics.mean(travel_times_trucks),
-        'mean_len_km'             : statistics.mean(trip_lengths_km),
-        'rot_ehv_car_times'       : rot_ehv_car_times,  
-        'mean_rot_ehv_car_tt'     : (statistics.mean(rot_ehv_car_times)
-                                     if rot_ehv_car_times else math.nan),
-        'std_tt_all'              : statistics.stdev(travel_times_all)
-                                      if len(travel_times_all) > 1 else 0.0,
-        'std_tt_car'              : statistics.stdev(travel_times_cars)
-                                      if len(travel_times_cars) > 1 else 0.0,
-        'std_tt_truck'            : statistics.stdev(travel_times_trucks)
-                                      if len(travel_times_trucks) > 1 else 0.0,
-        'std_len_km'              : statistics.stdev(trip_lengths_km)
-                                      if len(trip_lengths_km) > 1 else 0.0,
-    }
-    return stats
+    Without incidents vehicles do not interact, so the order in which ARRIVAL and
+    DEPARTURE events are handled does not matter.  All arrivals, OD pairs,
+    vehicle classes and route travel times of the day are drawn as NumPy arrays
+    and the statistics follow from array reductions.  As in the event-driven
+    version only vehicles that leave the network within 24 h are counted.
+
+    With `antithetic` set (False/True) every random number is generated by
+    inversion of one uniform U (True: of 1 − U), so that the runs with False and
+    True for the same seed form an antithetic pair.
+    """
+    if routes is None:
+        routes = RouteTable(G)
+    streams = RandomStreams(run_seed)
+
+    def stream(name):
+        rng = streams.generator(name)
+        return rng if antithetic is None else UniformGenerator(rng, antithetic)
+
+    arrivals = stream('arrivals')
+    routing = stream('routing')
+
+    if arrival_process is None:
+        arrival_process = ARRIVAL_PROCESS
+    t_arr = arrival_process.sample(arrivals)   # the whole day at once
+    n_arr = len(t_arr)
+
+    is_car = stream('vehicle_class').random(n_arr) < CAR_FRACTION
+    n_nodes = len(routes.nodes)
+    origins, dests = ODSampler(n_nodes).sample(n_arr, routing)   # dest != origin
+
+    tt = sample_travel_times_batch(routes, origins, dests, is_car,
+                                   stream('link_time'))
+    len_km = routes.length_matrix()[origins, dests]
+
+    acc = _day_accumulators(routes, rotterdam_id, eindhoven_id)
+    acc['arr_len_km'].add_many(len_km)
+
+    done = t_arr + tt <= SIM_DURATION_MIN
+    tt, len_km, is_car = tt[done], len_km[done], is_car[done]
+    origins, dests = origins[done], dests[done]
+
+    acc['tt_all'].add_many(tt)
+    acc['len_km'].add_many(len_km)
+    acc['tt_car'].add_many(tt[is_car])
+    acc['tt_truck'].add_many(tt[~is_car])
+    rot_ehv = (is_car & (origins == routes.nodes.index(rotterdam_id))
+               & (dests == routes.nodes.index(eindhoven_id)))
+    acc['rot_ehv_car_tt'].add_many(tt[rot_ehv])
+    return _day_stats(acc)
+
+# Replications, serial or on a process pool
+
+_worker_args: tuple = ()
+
+def _init_worker(*args) -> None:
+    """Receive the graph, route table and settings once per worker process."""
+    global _worker_args
+    _worker_args = args
+
+def _run_replication(job: Tuple[np.random.SeedSequence, bool]) -> Dict[str, float]:
+    G, node_ids, rotterdam_id, eindhoven_id, routes, vectorized, arrival_process = _worker_args
+    seed, antithetic = job
+    if vectorized:
+        return simulate_one_day_array(G, node_ids, rotterdam_id, eindhoven_id,
+                                      seed, routes, antithetic, arrival_process)
+    return simulate_one_day(G, node_ids, rotterdam_id, eindhoven_id, seed, routes,
+                            arrival_process=arrival_process)
+
+def run_replications(G: nx.Graph,
+                     node_ids: List[int],
+                     rotterdam_id: int,
+                     eindhoven_id: int,
+                     n_runs: int = N_RUNS,
+                     seed=RANDOM_SEED,
+                     routes: RouteTable = None,
+                     vectorized: bool = None,
+                     n_workers: int = None,
+                     antithetic: bool = False,
+                     arrival_process: ArrivalProcess = None) -> List[Dict[str, float]]:
+    """
+    Run `n_runs` independent replications and return their stats in run order.
+
+    Every replication gets its own stream spawned from `SeedSequence(seed)`, so
+    the results do not depend on `n_workers`.  `seed` may also be a
+    SeedSequence, in which case new children are spawned from it.  With more
+    than one worker the graph and route table are sent to each worker process
+    once.  With `antithetic` the runs form n_runs / 2 antithetic pairs (original
+    run followed by its antithetic run; array engine only).  `vectorized` and
+    `n_workers` default to the VECTORIZED and N_WORKERS settings at call time
+    (n_workers=0: all cores), `arrival_process` to ARRIVAL_PROCESS.
+    """
+    if routes is None:
+        routes = RouteTable(G)
+    if arrival_process is None:
+        arrival_process = ARRIVAL_PROCESS
+    vectorized, n_workers = _replication_settings(vectorized, n_workers)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    jobs = _replication_jobs(seed, n_runs, vectorized, antithetic)
+    args = (G, node_ids, rotterdam_id, eindhoven_id, routes, vectorized, arrival_process)
+
+    if n_workers == 1:
+        _init_worker(*args)
+        return [_run_replication(job) for job in jobs]
+
+    pool, n_workers = _replication_pool(n_workers, args)
+    with pool:
+        return _map_replications(pool, n_workers, jobs)
+
+def _replication_settings(vectorized: bool, n_workers: int) -> Tuple[bool, int]:
+    """Fill in the VECTORIZED / N_WORKERS settings for arguments left at None."""
+    return (VECTORIZED if vectorized is None else vectorized,
+            N_WORKERS if n_workers is None else n_workers)
+
+def _replication_jobs(seed: np.random.SeedSequence, n_runs: int, vectorized: bool,
+                      antithetic: bool) -> List[tuple]:
+    if antithetic:
+        if not vectorized:
+            raise ValueError("Antithetic replications need the array engine (vectorized=True)")
+        if n_runs % 2:
+            raise ValueError("Antithetic replications need an even number of runs")
+        return [(s, anti) for s in seed.spawn(n_runs // 2) for anti in (False, True)]
+    return [(s, None) for s in seed.spawn(n_runs)]
+
+def _replication_pool(n_workers: int, args: tuple) -> Tuple[ProcessPoolExecutor, int]:
+    """Return a worker pool and its number of workers."""
+    n_workers = n_workers or os.cpu_count() or 1
+    return ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                               initargs=args), n_workers
+
+def _map_replications(pool: ProcessPoolExecutor, n_workers: int,
+                      jobs: List[tuple]) -> List[Dict[str, float]]:
+    chunksize = max(1, len(jobs) // (4 * n_workers))
+    return list(pool.map(_run_replication, jobs, chunksize=chunksize))
+
+def run_until_precision(G: nx.Graph,
+                        node_ids: List[int],
+                        rotterdam_id: int,
+                        eindhoven_id: int,
+                        routes: RouteTable = None,
+                        rel_half_width: float = TARGET_REL_HALF_WIDTH,
+                        measures: List[str] = TARGET_MEASURES,
+                        min_runs: int = MIN_RUNS,
+                        batch_runs: int = BATCH_RUNS,
+                        max_runs: int = MAX_RUNS,
+                        max_seconds: float = MAX_SECONDS,
+                        seed: int = RANDOM_SEED,
+                        vectorized: bool = None,
+                        n_workers: int = None,
+                        antithetic: bool = False,
+                        control_variates: bool = False,
+                        arrival_process: ArrivalProcess = None) -> List[Dict[str, float]]:
+    """
+    Run replications in batches until the Student-t CI half-width of every
+    Table 1 measure in `measures` is at most `rel_half_width` × |mean|.
+
+    Starts with `min_runs` replications, then adds `batch_runs` at a time
+    (on a worker pool if `n_workers` != 1) and stops early when `max_runs`
+    replications or `max_seconds` of wall time are used up.  The replications
+    use the same streams as `run_replications`, so the first n runs do not
+    depend on the batch size or the number of workers.
+    """
+    if routes is None:
+        routes = RouteTable(G)
+    if arrival_process is None:
+        arrival_process = ARRIVAL_PROCESS
+    vectorized, n_workers = _replication_settings(vectorized, n_workers)
+    if measures is None:
+        measures = [key for _, key in TABLE1_MEASURES]
+    labels = {key: label for label, key in TABLE1_MEASURES}
+    seed = np.random.SeedSequence(seed)
+    args = (G, node_ids, rotterdam_id, eindhoven_id, routes, vectorized, arrival_process)
+
+    pool = None
+    if n_workers == 1:
+        _init_worker(*args)
+    else:
+        pool, n_workers = _replication_pool(n_workers, args)
+
+    start = time.perf_counter()
+    run_stats: List[Dict[str, float]] = []
+    n_next = min_runs
+    try:
+        while True:
+            jobs = _replication_jobs(seed, n_next, vectorized, antithetic)
+            if pool is None:
+                run_stats.extend(_run_replication(job) for job in jobs)
+            else:
+                run_stats.extend(_map_replications(pool, n_workers, jobs))
+
+            estimates = dict(table1_estimates(run_stats, routes, antithetic,
+                                              control_variates, arrival_process))
+            widths = {key: (estimates[labels[key]].ci_up - estimates[labels[key]].mean)
+                           / abs(estimates[labels[key]].mean)
+                      for key in measures}
+            worst = max(widths, key=lambda k: widths[k])
+            print(f"{len(run_stats)} runs – widest relative half-width "
+                  f"{widths[worst]:.5f} ({labels[worst]})")
+
+            if all(w <= rel_half_width for w in widths.values()):
+                break
+            if len(run_stats) >= max_runs or time.perf_counter() - start >= max_seconds:
+                print("Replication budget exhausted before reaching the target precision")
+                break
+            n_next = min(batch_runs, max_runs - len(run_stats))
+            if antithetic:
+                n_next += n_next % 2
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return run_stats
+
+# Table 1
+
+TABLE1_MEASURES = [
+    ('Total number of vehicles',              'total_vehicles'),
+    ('Travel time (arbitrary vehicle) [min]', 'mean_tt_all'),
+    ('Travel time car [min]',                 'mean_tt_car'),
+    ('Travel time truck [min]',               'mean_tt_truck'),
+    ('Travel time Rot→Ehv (car) [min]',       'mean_rot_ehv_car_tt'),
+    ('Route length [km]',                     'mean_len_km'),
+]
+
+def table1_estimates(run_stats: List[Dict[str, float]],
+                     routes: RouteTable,
+                     antithetic: bool = False,
+                     control_variates: bool = False,
+                     arrival_process: ArrivalProcess = None) -> List[tuple]:
+    """
+    Return (label, Estimate) for every row of Table 1.
+
+    With `antithetic` the runs are antithetic pairs (see `run_replications`).
+    With `control_variates` every row is corrected with two controls whose mean
+    is known exactly: the number of arrivals (E = Λ(24 h) of `arrival_process`,
+    the process the runs were drawn from; default ARRIVAL_PROCESS) and the mean
+    route length of the arrivals (E = average over all OD pairs of the route
+    table).
+    """
+    if control_variates:
+        if arrival_process is None:
+            arrival_process = ARRIVAL_PROCESS
+        n = len(routes.nodes)
+        controls = [[r['n_arrivals'] for r in run_stats],
+                    [r['mean_arr_len_km'] for r in run_stats]]
+        control_means = [arrival_process.expected_count,
+                         routes.length_matrix().sum() / (n * (n - 1))]
+    else:
+        controls, control_means = [], []
+    return [(label, estimate([r[key] for r in run_stats], controls, control_means,
+                             antithetic))
+            for label, key in TABLE1_MEASURES]
 
 def main():
   
@@ -179,52 +606,55 @@ def main():
     except KeyError as e:
         raise KeyError(f"Could not find junction name {e} in GML file")
 
-    run_stats: List[Dict[str, float]] = []
+    # Shortest routes do not change between replications: compute them once.
+    routes = RouteTable(G)
 
-    all_rot_ehv_car_times: List[float] = []
+    if SEQUENTIAL:
+        run_stats = run_until_precision(G, node_ids, rotterdam_id, eindhoven_id, routes,
+                                        TARGET_REL_HALF_WIDTH, TARGET_MEASURES,
+                                        MIN_RUNS, BATCH_RUNS, MAX_RUNS, MAX_SECONDS,
+                                        RANDOM_SEED, VECTORIZED, N_WORKERS,
+                                        ANTITHETIC, CONTROL_VARIATES, ARRIVAL_PROCESS)
+    else:
+        run_stats = run_replications(G, node_ids, rotterdam_id, eindhoven_id,
+                                     N_RUNS, RANDOM_SEED, routes,
+                                     vectorized=VECTORIZED, n_workers=N_WORKERS,
+                                     antithetic=ANTITHETIC,
+                                     arrival_process=ARRIVAL_PROCESS)
+    n_runs = len(run_stats)
 
-    for run in range(N_RUNS):
-        seed = RANDOM_SEED + run  
-        s = simulate_one_day(G, node_ids, rotterdam_id, eindhoven_id, seed)
-        run_stats.append(s)
-        all_rot_ehv_car_times.extend(s['rot_ehv_car_times'])
+    all_rot_ehv_car_tt = RunningStats(rot_ehv_hist_bins(routes, rotterdam_id,
+                                                        eindhoven_id))
 
-        print(f"Run {run+1}/{N_RUNS}  –  vehicles: {s['total_vehicles']}")
+    for run, s in enumerate(run_stats):
+        all_rot_ehv_car_tt.merge(s['rot_ehv_car_tt'])
 
+        print(f"Run {run+1}/{n_runs}  –  vehicles: {s['total_vehicles']}")
 
-    def col(name_mean, name_std):
-        values_mean = [r[name_mean] for r in run_stats]
-        values_std  = [r[name_std]  for r in run_stats]
-        mean_of_means = statistics.mean(values_mean)
-        sd_of_means   = statistics.stdev(values_mean)
-        ci_low, ci_up = t_conf_interval(values_mean)
-        return mean_of_means, sd_of_means, ci_low, ci_up
 
-    rows = [
-        ('Total number of vehicles',
-            statistics.mean([r['total_vehicles'] for r in run_stats]),
-            statistics.stdev([r['total_vehicles'] for r in run_stats]),
-         *t_conf_interval([r['total_vehicles'] for r in run_stats])
-        ),
-        ('Travel time (arbitrary vehicle) [min]', *col('mean_tt_all', 'std_tt_all')),
-        ('Travel time car [min]',                 *col('mean_tt_car', 'std_tt_car')),
-        ('Travel time truck [min]',               *col('mean_tt_truck', 'std_tt_truck')),
-        ('Travel time Rot→Ehv (car) [min]',       *col('mean_rot_ehv_car_tt', 'mean_rot_ehv_car_tt')),
-        ('Route length [km]',                     *col('mean_len_km', 'std_len_km')),
-    ]
+    rows = table1_estimates(run_stats, routes, ANTITHETIC, CONTROL_VARIATES,
+                            ARRIVAL_PROCESS)
+    variance_reduction = ANTITHETIC or CONTROL_VARIATES
 
 
     print("\n\nTable 1 – Simulation results over "
-          f"{N_RUNS} runs (24 h each, no incidents)\n"
+          f"{n_runs} runs (24 h each, no incidents)\n"
           "(95 % confidence intervals for the mean)\n")
     header = f"{'Performance measure':37s}  {'Mean':>9s}  {'SD':>9s}  {'95% CI low':>12s}  {'95% CI up':>11s}"
+    if variance_reduction:
+        header += f"  {'VR factor':>9s}"
     print(header)
     print('-' * len(header))
-    for r in rows:
-        print(f"{r[0]:37s}  {r[1]:9.2f}  {r[2]:9.2f}  {r[3]:12.2f}  {r[4]:11.2f}")
+    for label, e in rows:
+        line = f"{label:37s}  {e.mean:9.2f}  {e.sd:9.2f}  {e.ci_low:12.2f}  {e.ci_up:11.2f}"
+        if variance_reduction:
+            line += f"  {e.vr_factor:9.2f}"
+        print(line)
 
     plt.figure(figsize=(7, 4))
-    plt.hist(all_rot_ehv_car_times, bins=20, edgecolor='black')
+    edges = all_rot_ehv_car_tt.bins
+    plt.hist(edges[:-1], bins=edges, weights=all_rot_ehv_car_tt.counts,
+             edgecolor='black')
     plt.title('Histogram of Car Travel Times\nRotterdam → Eindhoven (N runs)')
     plt.xlabel('Travel time [min]')
     plt.ylabel('Frequency')
@@ -232,6 +662,10 @@ def main():
     plt.tight_layout()
     plt.savefig('rotterdam_eindhoven_hist.png', dpi=300)
     print("\nHistogram saved as 'rotterdam_eindhoven_hist.png'")
+    outside = all_rot_ehv_car_tt.underflow + all_rot_ehv_car_tt.overflow
+    if outside:
+        print(f"({outside} of {all_rot_ehv_car_tt.n} travel times outside "
+              f"[{edges[0]:.1f}, {edges[-1]:.1f}] min are not shown)")
 
 if __name__ == '__main__':
     main()
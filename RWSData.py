@@ -0,0 +1,157 @@
+'''
+Ingestion of the monthly RWS traffic-jam files (e.g. 2024-11_rws_filedata.csv).
+
+read_rws_csv() reads one file with explicit dtypes (dates and times stay
+strings until they are parsed once, in a vectorized way) and adds the
+features used by the analysis:
+
+    DatumFileBegin, DatumFileEind   date (datetime64, midnight)
+    DatetimeFileBegin/-Eind         start and end time (datetime64)
+    TotalSeconds_TFB                seconds since midnight of the start
+    Hour, Hour_End                  hour of the day of start and end
+    Weekday                         day of the week of the start (Monday = 0)
+    DurationMin                     end - start, in minutes
+    FileDuurInSeconds               FileDuur (minutes) in seconds
+    TimeElapsed                     seconds since the previous start on the
+                                    same day (NaN for the first of a day)
+
+load_rws() does this for any number of files, sorts the result by start time
+and caches the cleaned frame of every file, keyed by the SHA-1 of the file
+contents: Parquet when pyarrow is installed, otherwise a pandas pickle.
+'''
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (Parquet cache)
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    CACHE_FORMAT = 'pickle'
+
+
+CACHE_VERSION = 1
+
+# Columns the analysis uses; other columns are read with pandas' defaults.
+RWS_DTYPES = {
+    'DatumFileBegin': 'string',
+    'DatumFileEind': 'string',
+    'TijdFileBegin': 'string',
+    'TijdFileEind': 'string',
+    'FileDuur': 'float64',
+}
+
+RWS_CSV_OPTIONS = {'sep': ';', 'decimal': ',', 'dtype': RWS_DTYPES}
+
+
+def file_hash(path, block_size=1 << 20):
+    '''
+    Returns the SHA-1 hex digest of the contents of the file 'path'.
+    '''
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def add_features(df):
+    '''
+    Adds the start/end/duration features (see the module docstring) to a raw
+    RWS frame, except TimeElapsed, which needs the rows of a whole day in
+    order (see add_time_elapsed). Works on any chunk of rows.
+    '''
+    begin_date = pd.to_datetime(df['DatumFileBegin'], format='%Y-%m-%d')
+    end_date = pd.to_datetime(df['DatumFileEind'], format='%Y-%m-%d')
+    begin_time = pd.to_timedelta(df['TijdFileBegin'])
+    end_time = pd.to_timedelta(df['TijdFileEind'])
+
+    df['DatumFileBegin'] = begin_date
+    df['DatumFileEind'] = end_date
+    df['DatetimeFileBegin'] = begin_date + begin_time
+    df['DatetimeFileEind'] = end_date + end_time
+    df['TotalSeconds_TFB'] = begin_time.dt.total_seconds()
+    df['Hour'] = (begin_time // pd.Timedelta(hours=1)).astype(np.int8)
+    df['Hour_End'] = (end_time // pd.Timedelta(hours=1)).astype(np.int8)
+    df['Weekday'] = begin_date.dt.weekday.astype(np.int8)
+    df['DurationMin'] = (df['DatetimeFileEind'] - df['DatetimeFileBegin']).dt.total_seconds() / 60
+    df['FileDuurInSeconds'] = df['FileDuur'] * 60
+    return df
+
+
+def add_time_elapsed(df):
+    '''
+    Adds TimeElapsed to a frame sorted by DatetimeFileBegin.
+    '''
+    df['TimeElapsed'] = df['DatetimeFileBegin'].diff().dt.total_seconds()
+    df.loc[df['DatumFileBegin'] != df['DatumFileBegin'].shift(), 'TimeElapsed'] = np.nan
+    return df
+
+
+def read_rws_csv(path):
+    '''
+    Reads one RWS file and returns the cleaned frame with all features,
+    sorted by start time.
+    '''
+    df = add_features(pd.read_csv(path, **RWS_CSV_OPTIONS))
+    df = df.sort_values('DatetimeFileBegin', kind='stable', ignore_index=True)
+    return add_time_elapsed(df)
+
+
+def _cache_path(path, cache_dir):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    ext = '.parquet' if CACHE_FORMAT == 'parquet' else '.pkl'
+    return os.path.join(cache_dir, f'{stem}-v{CACHE_VERSION}-{file_hash(path)}{ext}')
+
+
+def load_rws(paths, cache_dir=None):
+    '''
+    Returns the cleaned frame of one or more RWS files (a path or a list of
+    paths), sorted by start time.
+
+    Args:
+            paths (str or list of str): the CSV files, e.g. one per month.
+            cache_dir (str, optional): directory for the cached frames; the
+            default is a folder 'rws_cache' next to every file. Pass False to
+            disable the cache.
+    '''
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    frames = []
+    for path in paths:
+        if cache_dir is False:
+            frames.append(read_rws_csv(path))
+            continue
+        folder = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), 'rws_cache')
+        cached = _cache_path(path, folder)
+        if os.path.exists(cached):
+            df = pd.read_parquet(cached) if CACHE_FORMAT == 'parquet' else pd.read_pickle(cached)
+        else:
+            df = read_rws_csv(path)
+            os.makedirs(folder, exist_ok=True)
+            if CACHE_FORMAT == 'parquet':
+                df.to_parquet(cached)
+            else:
+                df.to_pickle(cached)
+        frames.append(df)
+    if len(frames) == 1:
+        return frames[0]
+    # the days of different files may overlap (jams around midnight)
+    df = pd.concat(frames, ignore_index=True)
+    df = df.sort_values('DatetimeFileBegin', kind='stable', ignore_index=True)
+    return add_time_elapsed(df)
+
+
+def incidents_per_day(df):
+    '''
+    Number of incidents per start date, with the day name and an x-axis
+    label "<day of month>\\n<first letter of the day name>".
+    '''
+    per_day = df.groupby('DatumFileBegin').size().reset_index(name='incidents_per_day')
+    dates = per_day['DatumFileBegin']
+    per_day.insert(1, 'day_of_week', dates.dt.day_name())
+    per_day['custom_label'] = dates.dt.day.astype(str) + '\n' + per_day['day_of_week'].str[0]
+    return per_day
@@ -0,0 +1,135 @@
+'''
+Online (streaming) statistics for simulation output.
+
+Storing every observation of a replication in a list and calling
+statistics.mean / statistics.stdev afterwards costs memory proportional to the
+number of vehicles and is slow.  A RunningStats object keeps only the count,
+mean, sum of squared deviations (Welford's algorithm), minimum, maximum and,
+optionally, the counts of a fixed-bin histogram.  Two objects can be merged,
+so results of different replications or worker processes can be combined.
+'''
+
+import math
+from bisect import bisect_right
+
+import numpy as np
+
+
+class RunningStats:
+
+    '''
+    Constructor for this RunningStats class.
+
+    Args:
+            bins (sequence of float, optional): increasing bin edges of a
+            histogram to keep. Observations outside [bins[0], bins[-1]) are
+            counted in underflow and overflow.
+
+    Attributes:
+            n (int): number of observations
+            min, max (float): smallest and largest observation
+            bins (numpy array): histogram bin edges (None without histogram)
+            counts (numpy array): number of observations per bin
+            underflow, overflow (int): number of observations below bins[0]
+            and at or above bins[-1]
+    '''
+
+    def __init__(self, bins=None):
+        self.n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.underflow = 0
+        self.overflow = 0
+        if bins is None:
+            self.bins = None
+            self.counts = None
+        else:
+            self.bins = np.asarray(bins, dtype=float)
+            self.counts = np.zeros(len(self.bins) - 1, dtype=np.int64)
+            self._edges = self.bins.tolist()
+
+    def __str__(self):
+        return f'RunningStats(n={self.n}, mean={self.mean}, std={self.std})'
+
+    def add(self, x):
+        '''
+        Adds a single observation.
+        '''
+        self.n += 1
+        delta = x - self._mean
+        self._mean += delta / self.n
+        self._m2 += delta * (x - self._mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        if self.counts is not None:
+            i = bisect_right(self._edges, x) - 1
+            if i < 0:
+                self.underflow += 1
+            elif i < len(self.counts):
+                self.counts[i] += 1
+            else:
+                self.overflow += 1
+
+    def add_many(self, xs):
+        '''
+        Adds an array of observations at once.
+        '''
+        xs = np.asarray(xs, dtype=float)
+        if len(xs) == 0:
+            return
+        batch = RunningStats(self.bins)
+        batch.n = len(xs)
+        batch._mean = float(xs.mean())
+        batch._m2 = float(((xs - batch._mean) ** 2).sum())
+        batch.min = float(xs.min())
+        batch.max = float(xs.max())
+        if batch.counts is not None:
+            batch.counts += np.histogram(xs, self.bins)[0]
+            # np.histogram includes the last edge, add() does not
+            batch.counts[-1] -= np.count_nonzero(xs == self.bins[-1])
+            batch.underflow = int(np.count_nonzero(xs < self.bins[0]))
+            batch.overflow = int(np.count_nonzero(xs >= self.bins[-1]))
+        self.merge(batch)
+
+    def merge(self, other):
+        '''
+        Adds all observations of another RunningStats object (Chan et al.'s
+        parallel update). Both objects must use the same histogram bins.
+        Returns self.
+        '''
+        if other.n == 0:
+            return self
+        if (self.bins is None) != (other.bins is None) or (
+                self.bins is not None and not np.array_equal(self.bins, other.bins)):
+            raise ValueError('Cannot merge RunningStats with different histogram bins')
+        n = self.n + other.n
+        delta = other._mean - self._mean
+        self._mean += delta * other.n / n
+        self._m2 += other._m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if self.counts is not None:
+            self.counts += other.counts
+            self.underflow += other.underflow
+            self.overflow += other.overflow
+        return self
+
+    @property
+    def mean(self):
+        return self._mean if self.n > 0 else math.nan
+
+    @property
+    def var(self):
+        '''
+        Sample variance (n - 1 in the denominator), 0 for fewer than 2 observations.
+        '''
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
@@ -0,0 +1,88 @@
+'''
+Time series of "number of X active over time" based on difference arrays.
+
+Incrementing a counter for every minute of every interval costs
+O(intervals x duration). An ActiveCountSeries instead adds +1 at the bin where
+an interval starts and -1 at the bin where it ends, and takes the cumulative
+sum once when the series is needed, so the cost is O(intervals + bins).
+
+By default an interval [start, end) counts in every bin k (covering
+[k res, (k+1) res)) that it overlaps, so at a coarse resolution (e.g. hours)
+a short interval still counts in its bin. With overlap=False it counts in bin
+k when floor(start / res) <= k < floor(end / res), the same convention as
+"for minute in range(int(start), int(end))" for one-minute bins.
+'''
+
+import numpy as np
+
+
+RESOLUTIONS = {'seconds': 1 / 60, 'minutes': 1.0, 'hours': 60.0}
+
+
+class ActiveCountSeries :
+
+    '''
+    Constructor for this ActiveCountSeries class.
+
+    Args:
+            horizon (float): length of the time horizon, in minutes.
+            resolution (float or str): bin width in minutes, or one of
+            'seconds', 'minutes', 'hours'.
+            overlap (bool): count an interval in every bin it overlaps
+            (True) or in the bins floor(start / res) .. floor(end / res) - 1
+            (False; reproduces per-minute loops over range(int(start),
+            int(end))).
+
+    Intervals (or parts of intervals) outside [0, horizon) are ignored.
+    '''
+
+    def __init__(self, horizon, resolution='minutes', overlap=True):
+        if isinstance(resolution, str):
+            resolution = RESOLUTIONS[resolution]
+        self.resolution = resolution
+        self.overlap = overlap
+        self.n_bins = int(np.ceil(horizon / resolution))
+        self._diff = np.zeros(self.n_bins + 1, dtype=np.int64)
+
+    def _bin(self, t):
+        return min(max(int(t // self.resolution), 0), self.n_bins)
+
+    def _end_bin(self, t):
+        if not self.overlap:
+            return self._bin(t)
+        k = t // self.resolution
+        if k * self.resolution < t:  # t inside bin k: k is the last bin overlapped
+            k += 1
+        return min(max(int(k), 0), self.n_bins)
+
+    def add(self, start, end):
+        '''
+        Adds one interval [start, end).
+        '''
+        if end <= start:
+            return
+        b0, b1 = self._bin(start), self._end_bin(end)
+        if b0 < b1:
+            self._diff[b0] += 1
+            self._diff[b1] -= 1
+
+    def add_many(self, starts, ends):
+        '''
+        Adds the intervals [starts[i], ends[i]) at once.
+        '''
+        starts = np.asarray(starts, dtype=float)
+        ends = np.asarray(ends, dtype=float)
+        b0 = np.clip(np.floor_divide(starts, self.resolution), 0, self.n_bins).astype(np.int64)
+        k = np.floor_divide(ends, self.resolution)
+        if self.overlap:
+            k += k * self.resolution < ends
+        b1 = np.clip(k, 0, self.n_bins).astype(np.int64)
+        keep = (b0 < b1) & (starts < ends)
+        np.add.at(self._diff, b0[keep], 1)
+        np.add.at(self._diff, b1[keep], -1)
+
+    def counts(self):
+        '''
+        Returns the number of active intervals in every bin (numpy array).
+        '''
+        return np.cumsum(self._diff[:-1])
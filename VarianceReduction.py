@@ -0,0 +1,140 @@
+'''
+Variance reduction for replication estimates: antithetic replications and
+control variates.
+
+Antithetic replications come in pairs. The second replication of a pair uses
+1 - U wherever the first uses the uniform random number U, so both are
+identically distributed but negatively correlated, and the average of a pair
+has a smaller variance than the average of two independent replications.
+UniformGenerator produces all random numbers from uniforms by inversion so
+that the pairing holds for every distribution that is sampled.
+
+Control variates correct a replication output Y with outputs X whose
+expectation mu is known exactly:  Y - beta (X - mu), with beta estimated by
+least squares from the replications.
+
+Every estimate reports its variance reduction factor: the variance of the
+plain estimator (independent replications, same number of simulated runs)
+divided by the variance of the variance-reduced estimator.
+'''
+
+import math
+from typing import NamedTuple, Sequence
+
+import numpy as np
+from scipy import special, stats
+
+
+class UniformGenerator :
+
+    '''
+    Constructor for this UniformGenerator class.
+
+    Args:
+            rng (numpy Generator): source of the uniform random numbers.
+            antithetic (bool): use 1 - U instead of U.
+
+    Supports the subset of the numpy Generator interface used by the
+    simulations (random, uniform, integers, normal, poisson); each value is
+    obtained by inversion of exactly one uniform random number.
+    '''
+
+    _EPS = 1e-16
+
+    def __init__(self, rng, antithetic=False):
+        self.rng = rng
+        self.antithetic = antithetic
+
+    def random(self, size=None):
+        u = self.rng.random(size)
+        if self.antithetic:
+            u = 1.0 - u
+        return np.clip(u, self._EPS, 1.0 - self._EPS)
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        return low + (high - low) * self.random(size)
+
+    def integers(self, low, high=None, size=None):
+        if high is None:
+            low, high = 0, low
+        return low + np.floor((high - low) * self.random(size)).astype(np.int64)
+
+    def normal(self, loc=0.0, scale=1.0, size=None):
+        if size is None:
+            size = np.broadcast(np.asarray(loc), np.asarray(scale)).shape
+        return loc + scale * special.ndtri(self.random(size))
+
+    def poisson(self, lam=1.0, size=None):
+        if size is None:
+            size = np.shape(lam)
+        return stats.poisson.ppf(self.random(size), lam).astype(np.int64)
+
+
+class Estimate(NamedTuple):
+    mean: float
+    sd: float           # standard deviation of one (pair of) replication(s)
+    ci_low: float
+    ci_up: float
+    vr_factor: float    # variance of plain estimator / variance of this estimator
+
+
+def t_half_width(sd: float, n: int, dof: int, alpha: float = 0.05) -> float:
+    '''
+    Half-width of the (1 - alpha) Student-t confidence interval for a mean
+    estimated from n observations with standard deviation sd.
+    '''
+    if dof < 1:
+        return math.nan
+    return stats.t.ppf(1 - alpha / 2, dof) * sd / math.sqrt(n)
+
+
+def pair_means(values: Sequence[float]) -> np.ndarray:
+    '''
+    Averages of consecutive pairs (original, antithetic) of replication outputs.
+    '''
+    values = np.asarray(values, dtype=float)
+    if len(values) % 2:
+        raise ValueError('Antithetic replications must come in pairs')
+    return values.reshape(-1, 2).mean(axis=1)
+
+
+def estimate(y: Sequence[float], controls: Sequence[Sequence[float]] = (),
+             control_means: Sequence[float] = (), antithetic: bool = False,
+             alpha: float = 0.05) -> Estimate:
+    '''
+    Estimate E[Y] from replication outputs y.
+
+    Args:
+            y: output of every replication. With antithetic=True consecutive
+            replications form a pair (original, antithetic).
+            controls: one sequence per control variate with its value in every
+            replication (same order as y).
+            control_means: the known expectation of each control variate.
+            antithetic (bool): y (and the controls) come in antithetic pairs.
+    '''
+    y = np.asarray(y, dtype=float)
+    X = np.asarray(controls, dtype=float).reshape(len(control_means), len(y)).T
+    mu = np.asarray(control_means, dtype=float)
+
+    # the plain estimator averages all runs as if they were independent
+    var_plain = y.var(ddof=1) / len(y) if len(y) > 1 else math.nan
+
+    if antithetic:
+        y = pair_means(y)
+        X = X.reshape(len(y), 2, -1).mean(axis=1)
+    n, k = X.shape
+
+    if k > 0 and n > k + 1:
+        Xc = X - X.mean(axis=0)
+        beta = np.linalg.lstsq(Xc, y - y.mean(), rcond=None)[0]
+        y = y - (X - mu) @ beta
+        dof = n - 1 - k
+    else:
+        dof = n - 1
+
+    mean = float(y.mean())
+    sd = float(math.sqrt(((y - mean) ** 2).sum() / dof)) if dof > 0 else math.nan
+    half_width = t_half_width(sd, n, dof, alpha)
+    var_vr = sd ** 2 / n
+    vr_factor = var_plain / var_vr if var_vr > 0 else math.nan
+    return Estimate(mean, sd, mean - half_width, mean + half_width, vr_factor)
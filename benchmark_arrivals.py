@@ -0,0 +1,56 @@
+"""
+Benchmark: generating one day of nonhomogeneous Poisson arrivals
+================================================================
+
+Compares a per-hour loop (a Poisson count and uniform offsets per hour)
+with `ArrivalProcess`, which inverts a precomputed
+cumulative-rate table (one draw for the whole day, or one per hour for lazy
+generation), and with thinning, for the step and the piecewise-linear rate
+profile of HOURLY_RATES.  Also prints the mean number of arrivals per day,
+which should be close to sum(HOURLY_RATES) for every method.
+
+Run with `python benchmark_arrivals.py`.
+"""
+
+import time
+
+import numpy as np
+
+from Arrivals import ArrivalProcess
+from Question2 import HOURLY_RATES
+
+N_DAYS = 200
+
+STEP = ArrivalProcess.piecewise_constant(HOURLY_RATES, 60.0)
+LINEAR = ArrivalProcess.piecewise_linear(HOURLY_RATES, 60.0)
+
+
+def per_hour_loop(rng, rates=HOURLY_RATES, period=60.0):
+    return np.concatenate([h * period + np.sort(rng.uniform(0.0, period, rng.poisson(rate)))
+                           for h, rate in enumerate(rates)])
+
+
+METHODS = {
+    'per-hour loop (step)':         per_hour_loop,
+    'inversion, one draw (step)':   STEP.sample,
+    'inversion, per hour (step)':   lambda rng: np.concatenate(list(STEP.batches(rng))),
+    'inversion, one draw (linear)': LINEAR.sample,
+    'thinning (linear)':            LINEAR.sample_thinning,
+}
+
+
+def main():
+    print(f'Expected arrivals per day: {sum(HOURLY_RATES):.1f}\n')
+    print(f"{'method':30s}  {'ms/day':>8s}  {'arrivals/day':>12s}")
+    for name, method in METHODS.items():
+        rng = np.random.default_rng(42)
+        counts = []
+        start = time.perf_counter()
+        for _ in range(N_DAYS):
+            counts.append(len(method(rng)))
+        elapsed = time.perf_counter() - start
+        print(f'{name:30s}  {elapsed / N_DAYS * 1e3:8.3f}  {np.mean(counts):12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Microbenchmark: per-call latency of Distribution.rvs()
+=====================================================
+
+Compares the current `Distribution` class with the previous implementation
+(scipy `rvs` refills into a fixed buffer, NumPy scalars returned one at a time)
+and with calling scipy's `rvs()` directly, for the distributions used in the
+simulations.  Run with `python benchmark_distribution.py`.
+"""
+
+import timeit
+
+import numpy as np
+import scipy.stats as stats
+
+from Distribution import Distribution
+
+
+class LegacyDistribution:
+    """The sampling part of the previous Distribution class, for comparison."""
+
+    n = 10000
+
+    def __init__(self, dist):
+        self.dist = dist
+        self.resample()
+
+    def resample(self):
+        self.randomNumbers = self.dist.rvs(size=self.n)
+        self.idx = 0
+
+    def rvs(self, size=1):
+        if self.idx >= self.n - size:
+            while size > self.n:
+                self.n *= 10
+            self.resample()
+        if size == 1:
+            rs = self.randomNumbers[self.idx]
+        else:
+            rs = self.randomNumbers[self.idx:(self.idx + size)]
+        self.idx += size
+        return rs
+
+
+DISTRIBUTIONS = {
+    'normal'      : stats.norm(10.0, 0.5),
+    'gamma'       : stats.gamma(1.19, scale=6.09),
+    'exponential' : stats.expon(scale=4.0),
+    'uniform'     : stats.uniform(5.0, 10.0),
+    'poisson'     : stats.poisson(3.5),
+}
+
+N_CALLS = 200_000
+BATCH_SIZE = 100
+
+
+def per_call_ns(fn, n_calls):
+    return min(timeit.repeat(fn, number=n_calls, repeat=3)) / n_calls * 1e9
+
+
+def main():
+    header = (f"{'distribution':12s}  {'scipy rvs()':>12s}  {'legacy':>9s}  {'current':>9s}"
+              f"  {'legacy x100':>12s}  {'current x100':>12s}")
+    print('Per-call latency [ns]')
+    print(header)
+    print('-' * len(header))
+    for name, dist in DISTRIBUTIONS.items():
+        np.random.seed(0)
+        legacy = LegacyDistribution(dist)
+        current = Distribution(dist, rng=np.random.default_rng(0))
+
+        t_scipy = per_call_ns(dist.rvs, 2_000)
+        t_legacy = per_call_ns(legacy.rvs, N_CALLS)
+        t_current = per_call_ns(current.rvs, N_CALLS)
+        t_legacy_b = per_call_ns(lambda: legacy.rvs(BATCH_SIZE), N_CALLS // 10)
+        t_current_b = per_call_ns(lambda: current.rvs(BATCH_SIZE), N_CALLS // 10)
+
+        print(f"{name:12s}  {t_scipy:12.0f}  {t_legacy:9.0f}  {t_current:9.0f}"
+              f"  {t_legacy_b:12.0f}  {t_current_b:12.0f}")
+
+
+if __name__ == '__main__':
+    main()
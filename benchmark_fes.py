@@ -0,0 +1,65 @@
+"""
+Benchmark: binary heap vs calendar queue as future event set
+============================================================
+
+1. Hold model: the event set is filled with N events, after which every pop
+   is followed by a push of a new event a random time later (constant size).
+2. A full 24 h day of the Question 3 incident model with either event set.
+
+Run with `python benchmark_fes.py`.
+"""
+
+import os
+import random
+import runpy
+import time
+
+import networkx as nx
+
+from EventSet import CalendarQueue, HeapEventSet
+
+EVENT_SETS = {'heap': HeapEventSet, 'calendar queue': CalendarQueue}
+HOLD_SIZES = [1_000, 10_000, 60_000]
+HOLD_OPERATIONS = 200_000
+
+# Question 3 normally reads hourly incident rates from incident_rates.json;
+# a flat rate is enough to compare event sets.
+INCIDENT_RATES = [1.5] * 24
+
+
+def hold(event_set, size, operations, seed=0):
+    rnd = random.Random(seed)
+    fes = event_set()
+    for i in range(size):
+        fes.push((rnd.uniform(0.0, 1440.0), i))
+    start = time.perf_counter()
+    for i in range(operations):
+        t, _ = fes.pop()
+        fes.push((t + rnd.expovariate(size / 1440.0), i))
+    return time.perf_counter() - start
+
+
+def main():
+    print('Hold model: seconds per 1e6 pop+push pairs')
+    print(f"{'events':>8s}" + ''.join(f'  {name:>15s}' for name in EVENT_SETS))
+    for size in HOLD_SIZES:
+        times = [hold(es, size, HOLD_OPERATIONS) * 1e6 / HOLD_OPERATIONS for es in EVENT_SETS.values()]
+        print(f'{size:8d}' + ''.join(f'  {t:15.3f}' for t in times))
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    q3 = runpy.run_path(os.path.join(here, '#Question 3.py'), run_name='benchmark')
+    graph = nx.read_gml(os.path.join(here, 'networkAssignment.gml'))
+
+    print('\nQuestion 3, one 24 h day (seconds, best of 3)')
+    for name, es in EVENT_SETS.items():
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            sim = q3['run_discrete_event_sim'](graph, seed=42, event_set=es,
+                                                   incident_rates=INCIDENT_RATES)
+            best = min(best, time.perf_counter() - start)
+        print(f'{name:15s}  {best:7.3f}   ({len(sim.vehicle_stats)} vehicles)')
+
+
+if __name__ == '__main__':
+    main()